@@ -0,0 +1,198 @@
+# script/bulk_ingest.py
+"""
+Bulk-ingest a folder, or a .tar/.tar.gz/.tgz/.zip archive, of PDFs into Postgres and Chroma.
+
+    python script/bulk_ingest.py /data/papers --workers 8
+    python script/bulk_ingest.py archive.tar.gz --extract-to papers/archive
+
+Progress is checkpointed after every chunk, so an interrupted run picks up where it
+stopped when started again with the same arguments (use --reset to start over).
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tarfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".zip")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest a folder or archive of PDFs into the paper library.")
+    parser.add_argument("source", help="Directory (searched recursively) or .tar/.tar.gz/.tgz/.zip archive")
+    parser.add_argument("--extract-to", help="Where to unpack an archive (default: next to it, without the suffix)")
+    parser.add_argument("--workers", type=int, default=0, help="PDF parsing processes (default: CPU count - 1)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads for abstract validation")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Files per checkpointed chunk")
+    parser.add_argument("--batch-size", type=int, default=50, help="Papers per database commit")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <CACHE_DIR>/bulk_ingest_<name>.json)")
+    parser.add_argument("--label", default="bulk_ingest", help="Value stored in the papers' source column")
+    parser.add_argument("--no-index", action="store_true", help="Only load Postgres; skip Chroma indexing")
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint")
+    return parser.parse_args()
+
+
+def _safe_target(root, name):
+    """Resolve an archive member under ``root``; None for absolute or escaping paths."""
+    target = os.path.normpath(os.path.join(root, name))
+    return target if target.startswith(os.path.abspath(root) + os.sep) else None
+
+
+def extract_archive(archive, root):
+    """Unpack the PDFs in ``archive`` into ``root``, skipping files already unpacked."""
+    os.makedirs(root, exist_ok=True)
+    root = os.path.abspath(root)
+    if archive.endswith(".zip"):
+        with zipfile.ZipFile(archive) as zf:
+            members = [(m.filename, m.file_size, m) for m in zf.infolist() if not m.is_dir()]
+            opener = zf.open
+            _copy_members(members, root, opener)
+    else:
+        with tarfile.open(archive) as tf:
+            members = [(m.name, m.size, m) for m in tf.getmembers() if m.isfile()]
+            _copy_members(members, root, tf.extractfile)
+    return root
+
+
+def _copy_members(members, root, opener):
+    for name, size, member in members:
+        if not name.lower().endswith(".pdf"):
+            continue
+        target = _safe_target(root, name)
+        if target is None:
+            print(f"⚠️ Skipping unsafe archive path: {name}")
+            continue
+        if os.path.exists(target) and os.path.getsize(target) == size:
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with opener(member) as src, open(target + ".part", "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(target + ".part", target)
+
+
+def find_pdfs(root):
+    paths = []
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, f) for f in files if f.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+class Checkpoint:
+    """
+    Per-file outcomes keyed by path; a file counts as done while its size and mtime are
+    unchanged and, when indexing is requested, it was indexed.
+    """
+
+    def __init__(self, path, reset=False):
+        self.path = path
+        self.files = {}
+        if not reset and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_done(self, file_path, index=True):
+        entry = self.files.get(file_path)
+        if not entry or entry["status"] == "failed":
+            return False
+        if index and not entry.get("indexed"):
+            # Stored, but indexing failed or an earlier run used --no-index.
+            return False
+        stat = os.stat(file_path)
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def record(self, file_path, result):
+        stat = os.stat(file_path)
+        self.files[file_path] = {
+            "status": result.status, "file_hash": result.file_hash,
+            "indexed": result.indexed, "size": stat.st_size, "mtime": stat.st_mtime, "error": result.error,
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def main():
+    args = parse_args()
+    load_dotenv()
+    # The registry reads worker counts from the environment when it builds the pipeline.
+    if args.workers:
+        os.environ["INGEST_PROCESS_WORKERS"] = str(args.workers)
+    os.environ["INGEST_THREAD_WORKERS"] = str(args.threads)
+    from src.config import CACHE_DIR
+    from src.registry import build_default_registry
+    from src.ingest import IngestItem, summarize
+
+    source = os.path.abspath(args.source)
+    if os.path.isfile(source) and source.lower().endswith(ARCHIVE_SUFFIXES):
+        name = os.path.basename(source)
+        for suffix in ARCHIVE_SUFFIXES:
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        root = extract_archive(source, args.extract_to or os.path.join(os.path.dirname(source), name))
+        print(f"📦 Unpacked {args.source} into {root}")
+    elif os.path.isdir(source):
+        root = source
+    else:
+        sys.exit(f"❌ Not a directory or supported archive: {args.source}")
+
+    checkpoint = Checkpoint(
+        args.checkpoint or os.path.join(CACHE_DIR, f"bulk_ingest_{os.path.basename(root)}.json"),
+        reset=args.reset
+    )
+    all_files = find_pdfs(root)
+    files = [path for path in all_files if not checkpoint.is_done(path, index=not args.no_index)]
+    print(f"📄 {len(all_files)} PDFs found, {len(all_files) - len(files)} already done, {len(files)} to ingest")
+    if not files:
+        return
+
+    registry = build_default_registry()
+    pipeline = registry.get("metadata_ingest" if args.no_index else "ingest")
+    pipeline.batch_size = args.batch_size
+
+    results = []
+    started = time.perf_counter()
+    try:
+        for start in range(0, len(files), args.chunk_size):
+            chunk = files[start:start + args.chunk_size]
+            chunk_results = pipeline.ingest(
+                [IngestItem(os.path.relpath(path, root), path=path) for path in chunk],
+                source=args.label,
+                index=not args.no_index
+            )
+            for path, result in zip(chunk, chunk_results):
+                checkpoint.record(path, result)
+                if result.status == "failed":
+                    print(f"❌ {result.name}: {result.error}")
+            checkpoint.save()
+            results.extend(chunk_results)
+            elapsed = time.perf_counter() - started
+            print(f"[{len(results)}/{len(files)}] {len(results) / elapsed:.1f} docs/s")
+    except KeyboardInterrupt:
+        print("⏸️ Interrupted; progress is checkpointed, run again to resume")
+    finally:
+        registry.shutdown()
+
+    summary = summarize(results, time.perf_counter() - started)
+    print(
+        f"✅ {summary['files']} files in {summary['seconds']:.1f}s: "
+        f"{summary['inserted']} inserted, {summary['duplicate']} duplicates, {summary['failed']} failed | "
+        f"{summary['docs_per_second']:.2f} docs/s, {summary['mb_per_second']:.2f} MB/s"
+    )
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
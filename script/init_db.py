@@ -40,8 +40,10 @@ cur2.execute("""
         title TEXT NOT NULL,
         abstract TEXT,
         source TEXT,
+        file_hash TEXT UNIQUE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
+    CREATE INDEX IF NOT EXISTS idx_papers_created_at_id ON papers (created_at, id);
 """)
 conn2.commit()
 
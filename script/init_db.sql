@@ -11,5 +11,9 @@ CREATE TABLE IF NOT EXISTS papers (
     title TEXT NOT NULL,
     abstract TEXT,
     source TEXT, -- 'internal_upload' or 'web_search'
+    file_hash TEXT UNIQUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- 分頁查詢（created_at, id）使用的索引
+CREATE INDEX IF NOT EXISTS idx_papers_created_at_id ON papers (created_at, id);
\ No newline at end of file
@@ -0,0 +1,179 @@
+# src/abstract_validator.py
+import logging
+import re
+import threading
+import numpy as np
+from .embeddings import EmbeddingService
+from .llm_client import ChatClient
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Phrases typical of an abstract's framing.
+ABSTRACT_CUES = (
+    "we propose", "we present", "we introduce", "we show", "we study", "this paper", "in this paper",
+    "this work", "in this work", "our method", "our approach", "results show", "experiments",
+    "outperforms", "state-of-the-art", "method", "approach", "results",
+)
+
+# Markers of the text around an abstract: section headings, front matter, affiliations.
+SECTION_MARKERS = re.compile(
+    r"\b(?:introduction|keywords|index terms|references|acknowledg\w*|related work|university|institute|"
+    r"department|arxiv:\d|copyright|all rights reserved|preprint|proceedings)\b|@|©|^\s*\d+(?:\.\d+)*\s+[A-Z]",
+    re.IGNORECASE | re.MULTILINE
+)
+
+SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
+# Used as references until the library has abstracts of its own.
+SEED_ABSTRACTS = (
+    "We propose a novel method for learning representations from unlabeled data. Our approach combines "
+    "contrastive objectives with data augmentation. Experiments on standard benchmarks show that the method "
+    "outperforms prior work while requiring fewer parameters.",
+    "In this paper, we study the problem of efficient inference in large neural networks. We introduce a "
+    "pruning technique that reduces computation without sacrificing accuracy, and we evaluate it on image "
+    "classification and language modeling tasks. Results demonstrate significant speedups.",
+    "This work presents a framework for analyzing the robustness of machine learning models. We formalize "
+    "the threat model, derive theoretical guarantees, and validate our findings with extensive experiments. "
+    "Our results suggest practical guidelines for deploying models safely.",
+)
+
+
+class AbstractValidator:
+    """
+    Decide whether a text is a research abstract, locally where possible.
+
+    A structural score (position after an "Abstract" heading, length, sentence count,
+    abstract phrasing, absence of section markers) is blended with embedding similarity
+    to known abstracts. Scores at or above ``upper`` are accepted and at or below ``lower``
+    rejected without an API call; only candidates inside the band are sent to the LLM.
+    ``stats`` counts how often each path made the decision.
+    """
+
+    def __init__(self, embedding_service: EmbeddingService = None, chat: ChatClient = None,
+                 reference_loader=None, lower=0.35, upper=0.65, semantic_weight=0.3):
+        if not 0.0 <= lower <= upper <= 1.0:
+            raise ValueError(f"Invalid uncertainty band: [{lower}, {upper}]")
+        self.embeddings = embedding_service
+        self.chat = chat
+        self.reference_loader = reference_loader
+        self.lower = lower
+        self.upper = upper
+        self.semantic_weight = semantic_weight if embedding_service is not None else 0.0
+        self._centroid = None
+        self._lock = threading.Lock()
+        self._stats = {"accepted_local": 0, "rejected_local": 0, "llm": 0, "fallback": 0}
+
+    @staticmethod
+    def structural_score(text, after_heading=False):
+        """Score 0..1 from layout and wording alone."""
+        words = text.split()
+        n_words = len(words)
+        if 100 <= n_words <= 350:
+            length = 1.0
+        elif 50 <= n_words <= 500:
+            length = 0.6
+        elif 30 <= n_words <= 700:
+            length = 0.2
+        else:
+            length = 0.0
+        sentences = len(SENTENCE_END.findall(text))
+        sentence_score = 1.0 if 3 <= sentences <= 15 else 0.5 if 2 <= sentences <= 20 else 0.0
+        lowered = text.lower()
+        cues = min(1.0, sum(cue in lowered for cue in ABSTRACT_CUES) / 3)
+        markers = len(SECTION_MARKERS.findall(text))
+        clean = max(0.0, 1.0 - 0.35 * markers)
+        letters = sum(c.isalpha() for c in text)
+        prose = 1.0 if letters / max(1, len(text)) >= 0.7 else 0.3
+        return (
+            0.2 * (1.0 if after_heading else 0.0)
+            + 0.2 * length
+            + 0.15 * sentence_score
+            + 0.2 * cues
+            + 0.15 * clean
+            + 0.1 * prose
+        )
+
+    def semantic_score(self, text):
+        """Map similarity to the centroid of known abstracts onto 0..1; None if unavailable."""
+        centroid = self._reference_centroid()
+        if centroid is None:
+            return None
+        similarity = float(np.dot(self.embeddings.encode_one(text[:4000]), centroid))
+        # Abstracts of unrelated topics still sit around 0.3+ from the centroid; boilerplate well below.
+        return min(1.0, max(0.0, (similarity - 0.1) / 0.4))
+
+    def score(self, text, after_heading=False):
+        structural = self.structural_score(text, after_heading)
+        if not self.semantic_weight:
+            return structural
+        try:
+            semantic = self.semantic_score(text)
+        except Exception as e:
+            logger.warning(f"Abstract similarity check failed: {str(e)}")
+            semantic = None
+        if semantic is None:
+            return structural
+        return (1 - self.semantic_weight) * structural + self.semantic_weight * semantic
+
+    def is_valid(self, text, after_heading=False):
+        if not text or len(text) < 50:
+            return False
+        score = self.score(text, after_heading)
+        if score >= self.upper:
+            self._count("accepted_local")
+            return True
+        if score <= self.lower:
+            self._count("rejected_local")
+            return False
+        if self.chat is not None:
+            try:
+                verdict = self._ask_llm(text)
+                self._count("llm")
+                return verdict
+            except Exception as e:
+                logger.warning(f"LLM abstract check failed: {str(e)}")
+        self._count("fallback")
+        return score >= (self.lower + self.upper) / 2
+
+    def _ask_llm(self, text):
+        prompt = f"Please check if the following paragraph is likely to be a valid research abstract.\nRespond only 'yes' or 'no'.\n\n{text}"
+        answer = self.chat.complete(
+            "pdf.validate_abstract",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are an expert in academic writing."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0
+        )
+        return "yes" in answer.lower()
+
+    def _reference_centroid(self):
+        with self._lock:
+            if self._centroid is not None:
+                return self._centroid
+        references = []
+        if self.reference_loader is not None:
+            try:
+                references = [text for text in self.reference_loader() if text and len(text) >= 200]
+            except Exception as e:
+                logger.warning(f"Loading reference abstracts failed: {str(e)}")
+        vectors = self.embeddings.encode_many([text[:4000] for text in references or SEED_ABSTRACTS])
+        centroid = vectors.mean(axis=0)
+        centroid /= np.linalg.norm(centroid) or 1.0
+        with self._lock:
+            self._centroid = centroid
+        return centroid
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Decision counts per path, plus the share decided without an API call."""
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats.values())
+        stats["local_rate"] = (stats["accepted_local"] + stats["rejected_local"]) / total if total else 0.0
+        return stats
@@ -1,22 +1,85 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import streamlit as st
 import tenacity
 import logging
-import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from openai import OpenAI
-from .config import get_openai_client
+from .config import get_openai_client, COMPARE_MAX_WORKERS
+from .embeddings import EmbeddingService
+from .llm_client import ChatClient
+from .resilience import CircuitOpenError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COMPARISON_UNAVAILABLE = """
+            - Similarities: Unable to analyze (API error)
+            - Differences: Unable to analyze (API error)
+            - Key Insights: Please check API connection or try again later
+            """
+
+
+def format_comparison(similarity, comparison):
+    """Prefix a GPT comparison with the embedding similarity score."""
+    return f"""
+        **Semantic Similarity**: {similarity:.2f} (0 to 1, 1 is identical)
+        {comparison}
+        """
+
+
+@dataclass
+class PairComparison:
+    """Outcome of one comparison in a ``compare_pairs`` batch."""
+    index: int
+    similarity: float
+    text: str
+    latency: float
+    usage: dict = None
+    cached: bool = False
+    error: str = None
+
+class ComparisonStream:
+    """
+    Iterable of comparison text chunks as the model produces them.
+
+    ``similarity`` is known before iteration starts. Once the stream is exhausted,
+    ``text`` holds the full formatted comparison (as ``compare_abstracts`` returns it)
+    and ``ttft`` the seconds from request to first chunk.
+    """
+
+    def __init__(self, similarity, chunks):
+        self.similarity = similarity
+        self.text = None
+        self.ttft = None
+        self.error = None
+        self._chunks = chunks
+
+    def __iter__(self):
+        started = time.perf_counter()
+        parts = []
+        try:
+            for chunk in self._chunks:
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - started
+                    logger.info(f"Comparison time to first token: {self.ttft:.2f}s")
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"GPT comparison failed: {str(e)}")
+            self.error = str(e)
+            parts = [COMPARISON_UNAVAILABLE]
+            yield COMPARISON_UNAVAILABLE
+        self.text = format_comparison(self.similarity, "".join(parts).strip())
+
+
 class PaperComparator:
-    def __init__(self):
+    def __init__(self, embedding_service: EmbeddingService = None, chat: ChatClient = None):
         self.client = get_openai_client()
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.embedding_cache = {}
+        self.chat = chat or ChatClient(self.client)
+        self.embeddings = embedding_service or EmbeddingService()
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=4, max=10), stop=tenacity.stop_after_attempt(3))
     def compare_abstracts(self, abstract1, abstract2, topic=None):
         """
         Compare two abstracts semantically, generating a structured comparison in English.
@@ -29,24 +92,93 @@ class PaperComparator:
         Returns:
             str: Formatted comparison with similarities, differences, and insights in English.
         """
-        # Generate embeddings for semantic similarity using all-MiniLM-L6-v2
-        abs1_key = hashlib.md5(abstract1.encode()).hexdigest()
-        abs2_key = hashlib.md5(abstract2.encode()).hexdigest()
-        emb1 = self.embedding_cache.get(abs1_key)
-        emb2 = self.embedding_cache.get(abs2_key)
+        # Semantic similarity from the shared all-MiniLM-L6-v2 service (vectors are unit-length)
         try:
-            if not emb1 or not emb2:
-                embeddings = self.embedding_model.encode([abstract1[:8192], abstract2[:8192]], show_progress_bar=False)
-                emb1 = embeddings[0]
-                emb2 = embeddings[1]
-                self.embedding_cache[abs1_key] = emb1
-                self.embedding_cache[abs2_key] = emb2
-            similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
+            emb1, emb2 = self.embeddings.encode_many([abstract1[:8192], abstract2[:8192]])
+            similarity = float(np.dot(emb1, emb2))
         except Exception as e:
             logger.error(f"Embedding failed: {str(e)}")
             similarity = 0.0
 
-        # Prepare prompt for GPT-based comparison in English
+        try:
+            comparison, _, _ = self._complete_comparison(self._comparison_messages(abstract1, abstract2, topic, similarity))
+        except Exception as e:
+            logger.error(f"GPT comparison failed: {str(e)}")
+            comparison = COMPARISON_UNAVAILABLE
+        return format_comparison(similarity, comparison)
+
+    def compare_abstracts_stream(self, abstract1, abstract2, topic=None):
+        """
+        Streaming counterpart of ``compare_abstracts``.
+
+        Returns:
+            ComparisonStream: Iterate it (e.g. with ``st.write_stream``) to receive the
+            comparison as it is generated; ``text`` holds the formatted result afterwards.
+        """
+        try:
+            emb1, emb2 = self.embeddings.encode_many([abstract1[:8192], abstract2[:8192]])
+            similarity = float(np.dot(emb1, emb2))
+        except Exception as e:
+            logger.error(f"Embedding failed: {str(e)}")
+            similarity = 0.0
+        messages = self._comparison_messages(abstract1, abstract2, topic, similarity)
+        return ComparisonStream(
+            similarity,
+            self.chat.stream("compare.abstracts", model="gpt-3.5-turbo", messages=messages, temperature=0.3)
+        )
+
+    def compare_pairs(self, pairs, topic=None, max_workers=COMPARE_MAX_WORKERS):
+        """
+        Run GPT comparisons for many abstract pairs concurrently.
+
+        All abstracts are embedded in one batched call up front; completions are then
+        dispatched to at most ``max_workers`` threads. Every request still passes through
+        the shared OpenAI rate limiter, circuit breaker and retry policy, so the cap bounds
+        concurrency without bypassing throttling. A failed pair does not affect the others.
+
+        Args:
+            pairs (list[tuple[str, str]]): (abstract1, abstract2) pairs.
+            topic (str, optional): Topic to focus every comparison on.
+            max_workers (int): Maximum number of completions in flight.
+
+        Returns:
+            list[PairComparison]: One result per pair, in input order.
+        """
+        if not pairs:
+            return []
+        try:
+            embeddings = self.embeddings.encode_many([text[:8192] for pair in pairs for text in pair])
+            similarities = np.einsum("ij,ij->i", embeddings[0::2], embeddings[1::2]).tolist()
+        except Exception as e:
+            logger.error(f"Embedding failed: {str(e)}")
+            similarities = [0.0] * len(pairs)
+
+        def run(index):
+            abstract1, abstract2 = pairs[index]
+            started = time.perf_counter()
+            try:
+                content, usage, cached = self._complete_comparison(
+                    self._comparison_messages(abstract1, abstract2, topic, similarities[index])
+                )
+                error = None
+            except Exception as e:
+                logger.error(f"GPT comparison {index + 1} failed: {str(e)}")
+                content, usage, cached, error = COMPARISON_UNAVAILABLE, None, False, str(e)
+            return PairComparison(
+                index=index,
+                similarity=similarities[index],
+                text=format_comparison(similarities[index], content),
+                latency=time.perf_counter() - started,
+                usage=usage,
+                cached=cached,
+                error=error
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs))), thread_name_prefix="compare") as executor:
+            return list(executor.map(run, range(len(pairs))))
+
+    @staticmethod
+    def _comparison_messages(abstract1, abstract2, topic, similarity):
         prompt = f"""
         Compare the following two paper abstracts and generate a structured comparison in English, including:
         1. Similarities (at least 2 points)
@@ -62,26 +194,77 @@ class PaperComparator:
         Abstract 2:
         {abstract2[:4000]}
         """
-        try:
-            result = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a paper comparison expert, skilled at analyzing semantic differences and similarities in abstracts."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            comparison = result.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"GPT comparison failed: {str(e)}")
-            comparison = """
-            - Similarities: Unable to analyze (API error)
-            - Differences: Unable to analyze (API error)
-            - Key Insights: Please check API connection or try again later
-            """
-        
-        # Format output with similarity score
-        return f"""
-        **Semantic Similarity**: {similarity:.2f} (0 to 1, 1 is identical)
-        {comparison}
-        """
\ No newline at end of file
+        return [
+            {"role": "system", "content": "You are a paper comparison expert, skilled at analyzing semantic differences and similarities in abstracts."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @tenacity.retry(
+        wait=tenacity.wait_exponential(multiplier=1, min=4, max=10),
+        stop=tenacity.stop_after_attempt(3),
+        # An open circuit will not close within the retry window; fail fast instead.
+        retry=tenacity.retry_if_not_exception_type(CircuitOpenError),
+        reraise=True
+    )
+    def _complete_comparison(self, messages):
+        return self.chat.complete_with_usage("compare.abstracts", model="gpt-3.5-turbo", messages=messages, temperature=0.3)
+
+    def similarity_matrix(self, abstracts):
+        """
+        Encode all abstracts in one batched pass and return their cosine similarity matrix.
+
+        Args:
+            abstracts (list[str]): Abstracts to compare.
+
+        Returns:
+            np.ndarray: Symmetric (N, N) matrix; rows are unit vectors, so this is ``E @ E.T``.
+        """
+        embeddings = self.embeddings.encode_many([abstract[:8192] for abstract in abstracts])
+        return np.clip(embeddings @ embeddings.T, -1.0, 1.0)
+
+    def compare_many(self, papers, top_k=10, cluster_threshold=0.6):
+        """
+        Survey N papers for overlap without pairwise LLM or encode calls.
+
+        Args:
+            papers (list[tuple[str, str]]): (title, abstract) pairs.
+            top_k (int): Number of most similar pairs to return.
+            cluster_threshold (float): Minimum similarity linking two papers into a cluster.
+
+        Returns:
+            dict: ``matrix`` (N x N), ``pairs`` as (i, j, similarity) sorted by similarity,
+            and ``clusters`` as lists of paper indices (size >= 2, largest first).
+        """
+        n = len(papers)
+        if n < 2:
+            return {"matrix": np.zeros((n, n), dtype=np.float32), "pairs": [], "clusters": []}
+        matrix = self.similarity_matrix([abstract or title for title, abstract in papers])
+
+        # Upper triangle only: each unordered pair once, no self-similarity.
+        rows, cols = np.triu_indices(n, k=1)
+        scores = matrix[rows, cols]
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        pairs = [(int(rows[i]), int(cols[i]), float(scores[i])) for i in top]
+
+        return {"matrix": matrix, "pairs": pairs, "clusters": self._clusters(matrix >= cluster_threshold)}
+
+    @staticmethod
+    def _clusters(adjacency):
+        """Connected components of the thresholded similarity graph (single-linkage clusters)."""
+        n = len(adjacency)
+        labels = np.full(n, -1)
+        clusters = []
+        for seed in range(n):
+            if labels[seed] >= 0:
+                continue
+            labels[seed] = len(clusters)
+            members, frontier = [seed], [seed]
+            while frontier:
+                neighbours = np.flatnonzero(adjacency[frontier].any(axis=0) & (labels < 0))
+                labels[neighbours] = len(clusters)
+                members.extend(neighbours.tolist())
+                frontier = neighbours.tolist()
+            clusters.append(sorted(members))
+        return sorted((c for c in clusters if len(c) > 1), key=len, reverse=True)
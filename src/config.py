@@ -5,8 +5,28 @@ from openai import OpenAI
 
 load_dotenv()
 
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Comma-separated call sites that must always reach the API, e.g. "compare.abstracts".
+LLM_CACHE_DISABLED_SITES = [s.strip() for s in os.getenv("LLM_CACHE_DISABLED_SITES", "").split(",") if s.strip()]
+
+# Concurrent GPT comparisons per batch; the shared OpenAI rate limiter still applies.
+COMPARE_MAX_WORKERS = int(os.getenv("COMPARE_MAX_WORKERS", "4"))
+
+# Local abstract scores inside [LOW, HIGH] are escalated to the LLM; outside it they decide alone.
+ABSTRACT_UNCERTAIN_LOW = float(os.getenv("ABSTRACT_UNCERTAIN_LOW", "0.35"))
+ABSTRACT_UNCERTAIN_HIGH = float(os.getenv("ABSTRACT_UNCERTAIN_HIGH", "0.65"))
+
+# Ingestion: PDF parsing processes (0 = CPU count - 1) and validation/indexing threads.
+INGEST_PROCESS_WORKERS = int(os.getenv("INGEST_PROCESS_WORKERS", "0"))
+INGEST_THREAD_WORKERS = int(os.getenv("INGEST_THREAD_WORKERS", "8"))
+
 def get_openai_client():
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables")
-    return OpenAI(api_key=api_key)
+    # Keep the SDK's own retries short; the circuit breaker handles sustained outages.
+    return OpenAI(api_key=api_key, max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "1")), timeout=float(os.getenv("OPENAI_TIMEOUT", "60")))
@@ -1,7 +1,13 @@
 # src/database.py
 import psycopg2
 from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from dotenv import load_dotenv
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import threading
+import logging
+import time
 import os
 
 load_dotenv()
@@ -14,13 +20,123 @@ DB_PARAMS = {
     "password": os.getenv("DB_PASSWORD")
 }
 
+NO_ABSTRACT = "(No valid abstract found.)"
+PAPER_COLUMNS = {"id", "title", "abstract", "source", "file_hash", "created_at"}
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(PoolError):
+    """Raised when no pooled connection frees up within the checkout timeout."""
+
 class Database:
-    def __init__(self):
-        self.conn = psycopg2.connect(**DB_PARAMS)
+    def __init__(self, paper_cache_size=512, min_connections=1, max_connections=None,
+                 checkout_timeout=10.0, health_check_interval=30.0):
+        max_connections = max_connections or int(os.getenv("DB_POOL_SIZE", "10"))
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, **DB_PARAMS)
+        # ThreadedConnectionPool raises as soon as it is exhausted; the semaphore makes
+        # callers wait (up to checkout_timeout) for a free connection instead.
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.max_connections = max_connections
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._last_used = {}
+        self._stats_lock = threading.Lock()
+        self._waits = deque(maxlen=1000)
+        self._stats = {"checkouts": 0, "timeouts": 0, "reconnects": 0, "in_use": 0, "max_wait": 0.0, "total_wait": 0.0}
+        # LRU of hot (title, abstract) rows; rows are never updated in place, only deleted.
+        self._paper_cache = OrderedDict()
+        self._paper_cache_size = paper_cache_size
+        self._cache_lock = threading.Lock()
         self.setup_database()
 
+    def _checkout(self):
+        """Take a connection from the pool, replacing it if it is closed or fails a health check."""
+        conn = self.pool.getconn()
+        last_used = self._last_used.get(id(conn))
+        stale = last_used is None or time.monotonic() - last_used > self.health_check_interval
+        if conn.closed or stale:
+            try:
+                if conn.closed:
+                    raise psycopg2.InterfaceError("connection already closed")
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                logger.warning(f"Discarding broken database connection: {str(e)}")
+                self.pool.putconn(conn, close=True)
+                self._last_used.pop(id(conn), None)
+                with self._stats_lock:
+                    self._stats["reconnects"] += 1
+                conn = self.pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the duration of the block.
+
+        The transaction is committed when the block exits cleanly and rolled back
+        otherwise. Connections that fail with a connection-level error are closed
+        and dropped from the pool so the next checkout reconnects.
+        """
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._stats_lock:
+                self._stats["timeouts"] += 1
+            raise PoolTimeout(f"No database connection available within {self.checkout_timeout}s")
+        waited = time.perf_counter() - wait_start
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["total_wait"] += waited
+            self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+            self._waits.append(waited)
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if conn is not None and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None:
+                broken = broken or bool(conn.closed)
+                if not broken:
+                    self._last_used[id(conn)] = time.monotonic()
+                else:
+                    self._last_used.pop(id(conn), None)
+                    with self._stats_lock:
+                        self._stats["reconnects"] += 1
+                self.pool.putconn(conn, close=broken)
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+
+    def pool_stats(self):
+        """Return checkout counts and wait-time metrics (seconds) for sizing the pool."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits)
+        stats["max_connections"] = self.max_connections
+        stats["avg_wait"] = stats["total_wait"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        stats["p95_wait"] = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        return stats
+
     def setup_database(self):
-        with self.conn.cursor() as cur:
+        with self.cursor() as cur:
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS papers (
                     id SERIAL PRIMARY KEY,
@@ -30,41 +146,201 @@ class Database:
                     file_hash TEXT UNIQUE,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
+                CREATE INDEX IF NOT EXISTS idx_papers_created_at_id ON papers (created_at, id);
             """)
-            self.conn.commit()
 
     def insert_metadata(self, title, abstract, file_hash, source="internal_upload"):
-        with self.conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO papers (title, abstract, source, file_hash) VALUES (%s, %s, %s, %s) ON CONFLICT (file_hash) DO NOTHING",
-                (title, abstract, source, file_hash)
+        inserted, _ = self.insert_papers([
+            {"title": title, "abstract": abstract, "file_hash": file_hash, "source": source}
+        ])
+        return bool(inserted)
+
+    def insert_papers(self, papers):
+        """
+        Insert many papers in a single statement.
+
+        Args:
+            papers (list[dict]): Dicts with ``title``, ``abstract``, ``file_hash`` and ``source``.
+
+        Returns:
+            tuple: ({file_hash: id} for newly inserted rows, {file_hash: id} for hashes that
+            already existed). The id of an existing row is None if a concurrent insert won
+            the race and is not yet visible.
+        """
+        unique = {}
+        for paper in papers:
+            if paper.get("file_hash"):
+                unique.setdefault(paper["file_hash"], paper)
+        if not unique:
+            return {}, {}
+        values = [
+            (paper.get("title") or "Untitled", paper.get("abstract"), paper.get("source", "internal_upload"), file_hash)
+            for file_hash, paper in unique.items()
+        ]
+        # The outer SELECT runs on the statement's snapshot, so its second branch only
+        # sees rows that existed before this insert.
+        query = """
+            WITH input (title, abstract, source, file_hash) AS (VALUES %s),
+            ins AS (
+                INSERT INTO papers (title, abstract, source, file_hash)
+                SELECT title, abstract, source, file_hash FROM input
+                ON CONFLICT (file_hash) DO NOTHING
+                RETURNING id, file_hash
             )
-            self.conn.commit()
-            return cur.rowcount > 0
+            SELECT id, file_hash, TRUE FROM ins
+            UNION ALL
+            SELECT p.id, p.file_hash, FALSE FROM papers p JOIN input i ON p.file_hash = i.file_hash
+        """
+        with self.cursor() as cur:
+            rows = execute_values(cur, query, values, page_size=len(values), fetch=True)
+        inserted = {file_hash: pid for pid, file_hash, is_new in rows if is_new}
+        existing = {file_hash: None for file_hash in unique if file_hash not in inserted}
+        existing.update({file_hash: pid for pid, file_hash, is_new in rows if not is_new})
+        return inserted, existing
 
     def get_papers(self, limit=None):
-        with self.conn.cursor() as cur:
-            query = "SELECT id, title, abstract FROM papers ORDER BY id"
-            if limit:
-                query += f" LIMIT {limit}"
-            cur.execute(query)
+        with self.cursor() as cur:
+            cur.execute("SELECT id, title, abstract FROM papers ORDER BY id LIMIT %s", (limit,))
             return cur.fetchall()
 
+    def list_papers(self, columns=("id", "title"), limit=50, after=None, newest_first=False):
+        """
+        Return one page of papers ordered by (created_at, id), using keyset pagination.
+
+        Args:
+            columns (tuple): Columns to return; only what the caller needs is shipped.
+            limit (int): Page size.
+            after (tuple, optional): Cursor returned by the previous page.
+            newest_first (bool): Walk from the newest paper backwards.
+
+        Returns:
+            tuple: (rows, cursor for the next page or None when exhausted).
+        """
+        unknown = set(columns) - PAPER_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown paper columns: {', '.join(sorted(unknown))}")
+        direction = "DESC" if newest_first else "ASC"
+        comparison = "<" if newest_first else ">"
+        where = f"WHERE (created_at, id) {comparison} (%s, %s)" if after else ""
+        query = f"""
+            SELECT {', '.join(columns)}, created_at, id FROM papers
+            {where}
+            ORDER BY created_at {direction}, id {direction}
+            LIMIT %s
+        """
+        params = (*after, limit) if after else (limit,)
+        with self.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        cursor = (rows[-1][-2], rows[-1][-1]) if len(rows) == limit else None
+        return [row[:-2] for row in rows], cursor
+
+    def iter_papers(self, columns=("id", "title"), page_size=500, newest_first=False):
+        """Yield rows page by page so the full table is never held in one result set."""
+        cursor = None
+        while True:
+            rows, cursor = self.list_papers(columns, limit=page_size, after=cursor, newest_first=newest_first)
+            yield from rows
+            if cursor is None:
+                return
+
     def get_paper_by_id(self, paper_id):
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT title, abstract FROM papers WHERE id = %s", (paper_id,))
+        return self.get_paper_map([paper_id]).get(paper_id)
+
+    def get_paper_map(self, paper_ids):
+        """Return {id: (title, abstract)} for the given ids in one query, served from the LRU where possible."""
+        found = {}
+        missing = []
+        with self._cache_lock:
+            for pid in dict.fromkeys(paper_ids):
+                row = self._paper_cache.get(pid)
+                if row is not None:
+                    self._paper_cache.move_to_end(pid)
+                    found[pid] = row
+                else:
+                    missing.append(pid)
+        if missing:
+            rows = self.get_papers_by_ids(missing)
+            with self._cache_lock:
+                for pid, title, abstract, _ in rows:
+                    found[pid] = (title, abstract)
+                    self._paper_cache[pid] = (title, abstract)
+                    self._paper_cache.move_to_end(pid)
+                while len(self._paper_cache) > self._paper_cache_size:
+                    self._paper_cache.popitem(last=False)
+        return found
+
+    def get_papers_by_ids(self, paper_ids):
+        """Return (id, title, abstract, file_hash) rows for the given ids."""
+        if not paper_ids:
+            return []
+        with self.cursor() as cur:
+            cur.execute("SELECT id, title, abstract, file_hash FROM papers WHERE id = ANY(%s)", (list(paper_ids),))
+            return cur.fetchall()
+
+    def get_papers_after(self, last_id, limit=None):
+        """Return (id, title, abstract, file_hash, created_at) rows with id above the given high-water mark."""
+        with self.cursor() as cur:
+            cur.execute(
+                "SELECT id, title, abstract, file_hash, created_at FROM papers WHERE id > %s ORDER BY id LIMIT %s",
+                (last_id, limit)
+            )
+            return cur.fetchall()
+
+    def get_paper_watermark(self):
+        """Return (max id, row count, latest created_at) for cheap change detection."""
+        with self.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(id), 0), COUNT(*), MAX(created_at) FROM papers")
             return cur.fetchone()
 
+    def get_paper_digests(self):
+        """Return (id, md5 of title, abstract and file_hash joined by newlines) for every paper with a usable abstract."""
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id, md5(title || E'\\n' || abstract || E'\\n' || COALESCE(file_hash, '')) FROM papers
+                WHERE abstract IS NOT NULL AND abstract <> %s
+                """,
+                (NO_ABSTRACT,)
+            )
+            return cur.fetchall()
+
+    def get_reference_abstracts(self, limit=200):
+        """Return up to ``limit`` recent abstracts that passed validation, as exemplars."""
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                SELECT abstract FROM papers
+                WHERE abstract IS NOT NULL AND abstract <> %s
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+                """,
+                (NO_ABSTRACT, limit)
+            )
+            return [row[0] for row in cur.fetchall()]
+
     def delete_papers(self, paper_ids):
-        with self.conn.cursor() as cur:
-            cur.execute("DELETE FROM papers WHERE id = ANY(%s)", (paper_ids,))
-            self.conn.commit()
+        with self._cache_lock:
+            for pid in paper_ids:
+                self._paper_cache.pop(pid, None)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM papers WHERE id = ANY(%s)", (list(paper_ids),))
             return cur.rowcount
 
-    def get_known_hashes(self):
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT file_hash FROM papers")
+    def get_paper_id_by_hash(self, file_hash):
+        with self.cursor() as cur:
+            cur.execute("SELECT id FROM papers WHERE file_hash = %s", (file_hash,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def get_existing_hashes(self, candidates):
+        """Return the subset of ``candidates`` already stored, using the file_hash unique index."""
+        candidates = list(set(candidates))
+        if not candidates:
+            return set()
+        with self.cursor() as cur:
+            cur.execute("SELECT file_hash FROM papers WHERE file_hash = ANY(%s)", (candidates,))
             return set(row[0] for row in cur.fetchall())
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.pool.closeall()
\ No newline at end of file
@@ -0,0 +1,74 @@
+# src/embedding_cache.py
+import time
+import numpy as np
+from .sqlite_cache import SQLiteCache
+
+
+class EmbeddingCache(SQLiteCache):
+    """
+    Disk-backed embedding cache keyed by content hash and model name.
+
+    Vectors are stored as raw float16 (default) or float32 bytes, so a MiniLM vector
+    costs 768 or 1536 bytes on disk, and are returned as float32 arrays.
+    """
+
+    TABLE = "embeddings"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access);
+    """
+
+    def __init__(self, path, max_entries=200000, dtype="float16", evict_every=256):
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.dtype = dtype
+        super().__init__(path, max_entries=max_entries, evict_every=evict_every)
+
+    @staticmethod
+    def _key(model, content_hash):
+        return f"{model}:{content_hash}"
+
+    def get_many(self, model, content_hashes):
+        """Return {content_hash: float32 vector} for the hashes present in the cache."""
+        if not content_hashes:
+            return {}
+        keys = {self._key(model, h): h for h in content_hashes}
+        found = {}
+        key_list = list(keys)
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit.
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, dtype, blob in conn.execute(
+                f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ):
+                found[keys[key]] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+        self._touch([self._key(model, h) for h in found])
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, model, items):
+        """Store ``(content_hash, vector)`` pairs for ``model``."""
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (self._key(model, h), model, h, self.dtype, np.asarray(vector, dtype=self.dtype).tobytes(), now)
+            for h, vector in items
+        ]
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, content_hash, dtype, vector, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        self._after_write(len(rows))
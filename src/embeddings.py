@@ -0,0 +1,136 @@
+# src/embeddings.py
+from collections import OrderedDict
+from sentence_transformers import SentenceTransformer
+from chromadb.api.types import EmbeddingFunction
+from .embedding_cache import EmbeddingCache
+import numpy as np
+import hashlib
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+class EmbeddingService:
+    """
+    Own a single sentence-transformer model and serve normalized embeddings to every caller.
+
+    Vectors are L2-normalized once at encode time, so cosine similarity is a plain dot
+    product. Recently encoded texts are kept in an in-memory LRU keyed by content hash;
+    an optional ``EmbeddingCache`` persists them across reruns and processes.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, batch_size=64, cache_size=10000, disk_cache: EmbeddingCache = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.disk_cache = disk_cache
+        self._memory_stats = {"hits": 0, "misses": 0}
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_key(text):
+        return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+    def lookup(self, text):
+        """Return the cached vector for ``text`` or None without encoding."""
+        key = self.content_key(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def encode_many(self, texts):
+        """
+        Encode a batch of texts, reusing cached vectors.
+
+        Args:
+            texts (list[str]): Texts to encode.
+
+        Returns:
+            np.ndarray: Array of shape (len(texts), dimension) with unit-length rows.
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        keys = [self.content_key(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    vectors[i] = cached
+                else:
+                    missing.setdefault(key, []).append(i)
+            self._memory_stats["hits"] += len(texts) - sum(len(p) for p in missing.values())
+            self._memory_stats["misses"] += sum(len(p) for p in missing.values())
+        if missing and self.disk_cache is not None:
+            try:
+                stored = self.disk_cache.get_many(self.model_name, list(missing))
+            except Exception as e:
+                logger.warning(f"Embedding cache read failed: {str(e)}")
+                stored = {}
+            with self._lock:
+                for key, vector in stored.items():
+                    for i in missing.pop(key):
+                        vectors[i] = vector
+                    self._remember(key, vector)
+        if missing:
+            pending = [texts[positions[0]] for positions in missing.values()]
+            # The model is not safe to call from several threads at once.
+            with self._lock:
+                encoded = self.model.encode(
+                    pending,
+                    batch_size=self.batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                ).astype(np.float32)
+                for (key, positions), vector in zip(missing.items(), encoded):
+                    for i in positions:
+                        vectors[i] = vector
+                    self._remember(key, vector)
+            if self.disk_cache is not None:
+                try:
+                    self.disk_cache.put_many(self.model_name, list(zip(missing, encoded)))
+                except Exception as e:
+                    logger.warning(f"Embedding cache write failed: {str(e)}")
+        return np.vstack(vectors)
+
+    def encode_one(self, text):
+        """Encode a single text and return a unit-length vector."""
+        return self.encode_many([text])[0]
+
+    def cache_stats(self):
+        """Return in-memory and on-disk cache hit statistics."""
+        with self._lock:
+            memory = dict(self._memory_stats)
+        lookups = memory["hits"] + memory["misses"]
+        memory["hit_rate"] = memory["hits"] / lookups if lookups else 0.0
+        return {"memory": memory, "disk": self.disk_cache.stats() if self.disk_cache is not None else None}
+
+    def _remember(self, key, vector):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def as_chroma_function(self):
+        """Return an adapter so Chroma collections embed through this service."""
+        return ChromaEmbeddingFunction(self)
+
+
+class ChromaEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+
+    def __call__(self, input):
+        return self.service.encode_many(list(input)).tolist()
@@ -0,0 +1,229 @@
+# src/http_client.py
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .sqlite_cache import SQLiteCache
+from .resilience import get_endpoint, parse_retry_after
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Parameters whose values are free text; case and spacing do not change the result set.
+QUERY_PARAMS = {"query", "search_query"}
+
+
+class HTTPCache(SQLiteCache):
+    """On-disk store of successful GET responses with their validators (ETag / Last-Modified)."""
+
+    TABLE = "http_responses"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS http_responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_http_responses_last_access ON http_responses (last_access);
+    """
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT url, status, headers, body, etag, last_modified, fetched FROM http_responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, etag, last_modified, fetched = row
+        return {
+            "url": url, "status": status, "headers": json.loads(headers), "body": body,
+            "etag": etag, "last_modified": last_modified, "fetched": fetched
+        }
+
+    def put(self, key, url, response):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO http_responses (key, url, status, headers, body, etag, last_modified, fetched, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key, url, response.status_code, json.dumps(dict(response.headers)), response.content,
+                response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now
+            )
+        )
+        conn.commit()
+        self._after_write()
+
+    def record_hit(self, key):
+        self._touch([key])
+        self._count("hits")
+
+    def record_miss(self):
+        self._count("misses")
+
+    def refresh(self, key):
+        """Mark an entry as freshly validated after a 304 Not Modified."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("UPDATE http_responses SET fetched = ?, last_access = ? WHERE key = ?", (now, now, key))
+        conn.commit()
+
+
+class CachedResponse:
+    """The subset of ``requests.Response`` the search code uses, for network and cached replies alike."""
+
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP sessions, one per host, with an optional persistent GET cache.
+
+    Cached entries younger than ``ttl`` are served without touching the network. Older
+    entries are revalidated with If-None-Match / If-Modified-Since when the server sent
+    validators, so an unchanged result costs a 304 instead of a full download.
+    """
+
+    def __init__(self, cache: HTTPCache = None, ttl=24 * 3600, pool_maxsize=10):
+        self.cache = cache
+        self.ttl = ttl
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    @staticmethod
+    def cache_key(url, params=None):
+        """Key a GET by its normalized URL and sorted parameters."""
+        parts = urlsplit(url)
+        normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, ""))
+        normalized_params = []
+        for name, value in sorted((params or {}).items()):
+            value = re.sub(r"\s+", " ", str(value)).strip()
+            if name in QUERY_PARAMS:
+                value = value.lower()
+            normalized_params.append((name, value))
+        payload = json.dumps([normalized_url, normalized_params], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, url, params=None, headers=None, timeout=10, use_cache=True, ttl=None):
+        """
+        GET ``url`` through the host's pooled session, answering from the cache when fresh.
+
+        Returns:
+            CachedResponse: ``from_cache`` is True when no body was downloaded.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        use_cache = use_cache and self.cache is not None
+        key = self.cache_key(url, params) if use_cache else None
+        entry = None
+        request_headers = dict(headers or {})
+        if use_cache:
+            try:
+                entry = self.cache.get(key)
+            except Exception as e:
+                logger.warning(f"HTTP cache read failed: {str(e)}")
+            if entry and time.time() - entry["fetched"] <= ttl:
+                self.cache.record_hit(key)
+                return CachedResponse(entry["url"], entry["status"], entry["headers"], entry["body"], from_cache=True)
+            if entry and entry["etag"]:
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry and entry["last_modified"]:
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._guarded_get(url, params, request_headers, timeout)
+        if use_cache:
+            if response.status_code == 304 and entry:
+                self.cache.refresh(key)
+                self.cache.record_hit(key)
+                return CachedResponse(entry["url"], entry["status"], entry["headers"], entry["body"], from_cache=True)
+            self.cache.record_miss()
+            if response.status_code == 200:
+                try:
+                    self.cache.put(key, response.url, response)
+                except Exception as e:
+                    logger.warning(f"HTTP cache write failed: {str(e)}")
+        return CachedResponse(response.url, response.status_code, response.headers, response.content)
+
+    @contextmanager
+    def stream(self, url, params=None, headers=None, timeout=30):
+        """
+        Open an uncached streaming GET; the body is read incrementally from ``response.raw``.
+
+        The request still goes through the host's rate limiter and circuit breaker.
+        """
+        response = self._guarded_get(url, params, dict(headers or {}), timeout, stream=True)
+        try:
+            response.raw.decode_content = True
+            yield response
+        finally:
+            response.close()
+
+    def _guarded_get(self, url, params, headers, timeout, stream=False):
+        """
+        Send the request through the host's rate limiter and circuit breaker.
+
+        429 and 503 replies honour Retry-After by pausing the host's limiter; they and
+        other 5xx replies or connection errors count as failures toward opening the circuit.
+        """
+        endpoint = get_endpoint(urlsplit(url).netloc.lower())
+        endpoint.before_call()
+        try:
+            response = self.session(url).get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+        except requests.RequestException:
+            endpoint.record_failure()
+            raise
+        except Exception:
+            # Never reached the host, so say nothing about its health but free a half-open trial.
+            endpoint.breaker.release_trial()
+            raise
+        if response.status_code == 429 or response.status_code >= 500:
+            endpoint.record_failure(retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        else:
+            endpoint.record_success()
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -0,0 +1,233 @@
+# src/ingest.py
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from .database import Database
+from .pdf_processor import PDFProcessor
+from .pdf_parsing import prepare_pdf
+from .manifest import file_content_hash
+from .vector_store import VectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestItem:
+    """One PDF to ingest, given either as bytes or as a path on disk."""
+    name: str
+    data: bytes = None
+    path: str = None
+
+
+@dataclass
+class IngestResult:
+    """Outcome for one file: ``status`` is "inserted", "duplicate" or "failed"."""
+    name: str
+    status: str
+    file_hash: str = None
+    title: str = None
+    paper_id: int = None
+    size: int = 0
+    indexed: bool = False
+    preview: bytes = None
+    error: str = None
+
+
+class IngestPipeline:
+    """
+    Ingest many PDFs with parsing fanned out and network steps overlapped.
+
+    Files are hashed up front and those already in the database are skipped in one
+    file_hash lookup; only new files are parsed, in a process pool. Abstract validation
+    (which may call the LLM) runs on a bounded thread pool; accepted papers are
+    committed, and optionally indexed, ``batch_size`` at a time while later files are
+    still being validated. A failure in any step marks only that file as failed.
+    Progress callbacks run on the calling thread, so they may draw UI.
+    """
+
+    def __init__(self, db: Database, processor: PDFProcessor, vector_store: VectorStore = None,
+                 process_workers=None, thread_workers=8, batch_size=25):
+        self.db = db
+        self.processor = processor
+        self.vector_store = vector_store
+        self.process_workers = process_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.thread_workers = thread_workers
+        self.batch_size = batch_size
+        self._process_pool = None
+        self._thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+
+    @property
+    def process_pool(self):
+        with self._lock:
+            if self._process_pool is None:
+                # Spawned workers do not inherit the parent's threads, locks or connections.
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+
+    def ingest(self, items, source="internal_upload", index=False, preview_zoom=None, commit=None, on_progress=None):
+        """
+        Ingest ``items`` and return one IngestResult per item, in input order.
+
+        Args:
+            items (list[IngestItem]): Files to ingest.
+            source (str): Value stored in the papers' ``source`` column.
+            index (bool): Also index files that have a path into the vector store, reusing
+                the text parsed for metadata; already stored files missing from the index
+                are indexed too.
+            preview_zoom (float, optional): Render a first-page PNG preview at this zoom.
+            commit (callable, optional): Called with a list of paper dicts and returning
+                ``(inserted, existing)`` like ``Database.insert_papers`` (the default).
+            on_progress (callable, optional): Called as ``on_progress(result, done, total)``
+                as each file finishes.
+        """
+        commit = commit or self.db.insert_papers
+        index = index and self.vector_store is not None
+        results = [None] * len(items)
+        done = 0
+
+        def finish(position, result):
+            nonlocal done
+            results[position] = result
+            done += 1
+            if on_progress is not None:
+                on_progress(result, done, len(items))
+
+        # Hash in this process and drop known files before any parsing; uploads are already
+        # in memory and a streamed md5 of a path is far cheaper than opening the PDF.
+        hashed = []
+        for position, item in enumerate(items):
+            try:
+                if item.data is not None:
+                    hashed.append((position, hashlib.md5(item.data).hexdigest(), len(item.data)))
+                else:
+                    hashed.append((position, file_content_hash(item.path), os.path.getsize(item.path)))
+            except OSError as e:
+                finish(position, IngestResult(item.name, "failed", error=str(e)))
+        try:
+            known = self.db.get_existing_hashes([file_hash for _, file_hash, _ in hashed])
+        except Exception as e:
+            logger.error(f"Duplicate check for {len(hashed)} files failed: {str(e)}")
+            for position, file_hash, size in hashed:
+                finish(position, IngestResult(items[position].name, "failed", file_hash=file_hash, size=size, error=str(e)))
+            return results
+
+        prepare_futures = {}
+        reindex = {}
+        seen = set()
+        for position, file_hash, size in hashed:
+            item = items[position]
+            if file_hash in known or file_hash in seen:
+                result = IngestResult(item.name, "duplicate", file_hash=file_hash, size=size)
+                if index and item.path is not None:
+                    result.indexed = self.vector_store.is_pdf_indexed(item.path)
+                    if not result.indexed:
+                        # Stored by an earlier, interrupted or --no-index run before it was indexed.
+                        reindex[item.path] = result
+                finish(position, result)
+                continue
+            seen.add(file_hash)
+            future = self.process_pool.submit(prepare_pdf, item.data, item.path, index and item.path is not None, preview_zoom)
+            prepare_futures[future] = (position, file_hash, size)
+
+        extract_futures = {}
+        for future in as_completed(prepare_futures):
+            position, file_hash, size = prepare_futures[future]
+            item = items[position]
+            try:
+                parsed, preview = future.result()
+            except Exception as e:
+                logger.warning(f"Parsing {item.name} failed: {str(e)}")
+                finish(position, IngestResult(item.name, "failed", file_hash=file_hash, size=size, error=str(e)))
+                continue
+            if item.data is not None:
+                parsed.attach(item.data)
+            extract_futures[self._thread_pool.submit(self.processor.extract_title_abstract, parsed=parsed)] = (
+                position, file_hash, size, parsed, preview
+            )
+
+        def flush(batch):
+            try:
+                inserted, existing = commit([paper for _, paper, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Committing {len(batch)} papers failed: {str(e)}")
+                for position, paper, parsed, result in batch:
+                    parsed.close()
+                    result.status, result.error = "failed", str(e)
+                    finish(position, result)
+                return
+            to_index = {}
+            if index:
+                to_index = {
+                    items[position].path: (paper["file_hash"], parsed)
+                    for position, paper, parsed, _ in batch if items[position].path is not None
+                }
+                try:
+                    self.vector_store.sync_pdf_files(list(to_index), parsed=to_index)
+                except Exception as e:
+                    logger.warning(f"Indexing {len(to_index)} files failed: {str(e)}")
+            for position, paper, parsed, result in batch:
+                parsed.close()
+                if paper["file_hash"] in inserted:
+                    result.status, result.paper_id = "inserted", inserted[paper["file_hash"]]
+                else:
+                    result.status, result.paper_id = "duplicate", existing.get(paper["file_hash"])
+                result.indexed = items[position].path in to_index and self.vector_store.is_pdf_indexed(items[position].path)
+                finish(position, result)
+
+        batch = []
+        for future in as_completed(extract_futures):
+            position, file_hash, size, parsed, preview = extract_futures[future]
+            name = items[position].name
+            try:
+                title, abstract, _ = future.result()
+            except Exception as e:
+                logger.warning(f"Extracting {name} failed: {str(e)}")
+                parsed.close()
+                finish(position, IngestResult(name, "failed", file_hash=file_hash, size=size, error=str(e)))
+                continue
+            paper = {"title": title, "abstract": abstract, "file_hash": file_hash, "source": source}
+            result = IngestResult(name, "pending", file_hash=file_hash, title=title, size=size, preview=preview)
+            batch.append((position, paper, parsed, result))
+            if len(batch) >= self.batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        if reindex:
+            try:
+                self.vector_store.sync_pdf_files(list(reindex))
+            except Exception as e:
+                logger.warning(f"Indexing {len(reindex)} stored files failed: {str(e)}")
+            for path, result in reindex.items():
+                result.indexed = self.vector_store.is_pdf_indexed(path)
+        return results
+
+    def close(self):
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+
+def summarize(results, elapsed):
+    """Aggregate counts and throughput for a finished ingest."""
+    counts = {"inserted": 0, "duplicate": 0, "failed": 0}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    total_bytes = sum(result.size for result in results)
+    return {
+        **counts,
+        "files": len(results),
+        "seconds": elapsed,
+        "docs_per_second": len(results) / elapsed if elapsed else 0.0,
+        "mb_per_second": total_bytes / (1024 * 1024) / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,180 @@
+# src/intent_parser.py
+import re
+
+# Words that name a source or an action rather than a topic.
+EXCLUDE_WORDS = {'arxiv', 'semantic', 'scholar', 'query', 'search', 'local', 'for', 'about', 'papers', 'paper', '查詢', '查'}
+
+CHINESE_DIGITS = {"一": 1, "二": 2, "兩": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+SOURCE_ALIASES = {
+    "arxiv": "arxiv",
+    "semantic": "semantic",
+    "semantic scholar": "semantic",
+    "web": "web",
+    "local": "local",
+    "本地": "local",
+    "all": "all",
+    "everywhere": "all",
+    "both": "all",
+    "全部": "all",
+}
+
+_SOURCE = r"(arxiv|semantic scholar|semantic|web|local|本地|all|everywhere|both|全部)"
+_NUMBER = r"(\d+|[一二兩三四五六七八九十]+)"
+
+HISTORY_PATTERN = re.compile(r"^\s*(?:/history|list local papers|本地論文清單)\s*$", re.IGNORECASE)
+
+COMPARE_EN_PATTERN = re.compile(
+    rf"^\s*compare\s+(?:{_SOURCE}\s+)?papers?\s+(\d+)\s+(?:with|and|vs\.?|to)\s+(?:{_SOURCE}\s+)?(?:papers?\s+)?(\d+)"
+    r"(?:\s+(?:on|about|regarding|focusing on)\s+(?P<topic>.+?))?\s*[.?!]?\s*$",
+    re.IGNORECASE
+)
+
+# "compare local paper 1 with papers 2, 3 and 4": one anchor against several candidates.
+COMPARE_MANY_EN_PATTERN = re.compile(
+    rf"^\s*compare\s+(?:{_SOURCE}\s+)?papers?\s+(\d+)\s+(?:with|against|to|vs\.?)\s+(?:{_SOURCE}\s+)?(?:papers?\s+)?"
+    r"(?P<candidates>\d+(?:\s*(?:,|and|&)\s*(?:and\s+)?\d+)+)"
+    r"(?:\s+(?:on|about|regarding|focusing on)\s+(?P<topic>.+?))?\s*[.?!]?\s*$",
+    re.IGNORECASE
+)
+
+COMPARE_ZH_PATTERN = re.compile(
+    rf"比較\s*{_SOURCE}?\s*(?:的)?\s*第\s*{_NUMBER}\s*篇\s*(?:論文)?\s*(?:與|和|跟|及|vs\.?|with)\s*{_SOURCE}?\s*(?:的)?\s*第\s*{_NUMBER}\s*篇"
+    r"(?:.*?(?:關於|針對|主題[:：]?)\s*(?P<topic>[^\s，。,.]+))?",
+    re.IGNORECASE
+)
+
+COMPARE_ALL_PATTERN = re.compile(
+    rf"^\s*(?:compare|survey)\s+(?:all|every)\s+(?:{_SOURCE}\s+)?(?:papers|results)?\s*(?:max\s*(?P<limit>\d+))?\s*[.?!]?\s*$",
+    re.IGNORECASE
+)
+
+COMPARE_ALL_ZH_PATTERN = re.compile(rf"^\s*比較\s*(?:全部|所有)\s*{_SOURCE}?\s*(?:的)?\s*(?:論文|結果)\s*$")
+
+SEARCH_EN_PATTERN = re.compile(
+    rf"^\s*(?:search|find|query|look up)\s+(?:in\s+|on\s+)?{_SOURCE}\s+(?:for|about)?\s*(?P<rest>.+?)\s*$",
+    re.IGNORECASE
+)
+
+SEARCH_ZH_PATTERN = re.compile(
+    rf"^\s*(?:(?:查詢|查|搜尋|找)\s*{_SOURCE}|{_SOURCE}\s*(?:查詢|搜尋))\s*(?:的|關於)?\s*(?P<rest>.+?)\s*$",
+    re.IGNORECASE
+)
+
+SWEEP_PATTERN = re.compile(r"^\s*sweep\s+(?:arxiv\s+)?(?:for|on|about)?\s*(?P<rest>.+?)\s*$", re.IGNORECASE)
+
+MAX_PATTERN = re.compile(r"(?:最多|maximum|max)\s*(\d+)\s*(?:筆|results?)?", re.IGNORECASE)
+DAYS_PATTERN = re.compile(r"(?:最近|last)\s*(\d+)\s*(?:天|days?)", re.IGNORECASE)
+CJK_PATTERN = re.compile(r"[一-鿿]")
+
+
+def parse_number(token):
+    """Parse an Arabic or simple Chinese numeral (一 to 九十九)."""
+    if token.isdigit():
+        return int(token)
+    if token == "十":
+        return 10
+    if "十" in token:
+        tens, _, ones = token.partition("十")
+        return CHINESE_DIGITS.get(tens, 1) * 10 + CHINESE_DIGITS.get(ones, 0)
+    return CHINESE_DIGITS.get(token)
+
+
+def clean_keywords(text):
+    """Lower-case, drop source/action words and punctuation; returns '' if nothing is left."""
+    words = re.sub(r"[^\w\s\-]", " ", text.lower()).split()
+    return " ".join(word for word in words if word not in EXCLUDE_WORDS)
+
+
+def _source(token):
+    return SOURCE_ALIASES.get(token.lower()) if token else None
+
+
+def _search(source, rest):
+    max_results, days = None, None
+    max_match = MAX_PATTERN.search(rest)
+    if max_match:
+        max_results = int(max_match.group(1))
+        rest = rest[:max_match.start()] + rest[max_match.end():]
+    days_match = DAYS_PATTERN.search(rest)
+    if days_match:
+        days = int(days_match.group(1))
+        rest = rest[:days_match.start()] + rest[days_match.end():]
+    keywords = clean_keywords(rest)
+    # Non-English topics need translation for arXiv/Semantic Scholar; leave those to the LLM.
+    if not keywords or CJK_PATTERN.search(keywords):
+        return None
+    intent = {
+        "arxiv": "arxiv_search",
+        "semantic": "semantic_search",
+        "local": "local_query",
+        "all": "federated_search",
+    }.get(source)
+    if intent is None:
+        return None
+    return {"intent": intent, "keywords": keywords, "max_results": max_results, "days": days}
+
+
+def fast_parse(user_command):
+    """
+    Resolve the documented command forms without calling an LLM.
+
+    Returns:
+        dict or None: ``{"intent", ...}`` with ``sources``/``indices``/``topic`` for
+        comparisons and ``keywords``/``max_results``/``days`` for searches, or None when
+        the command does not match a known form and needs the LLM fallback.
+    """
+    if HISTORY_PATTERN.match(user_command):
+        return {"intent": "history"}
+
+    for pattern in (COMPARE_ALL_PATTERN, COMPARE_ALL_ZH_PATTERN):
+        match = pattern.match(user_command)
+        if match:
+            limit = match.groupdict().get("limit")
+            return {"intent": "compare_matrix", "sources": [_source(match.group(1))], "max_results": int(limit) if limit else None}
+
+    match = COMPARE_MANY_EN_PATTERN.match(user_command)
+    if match:
+        source1, anchor, source2 = match.group(1, 2, 3)
+        return {
+            "intent": "compare",
+            "sources": [_source(source1), _source(source2) or _source(source1)],
+            "indices": [int(anchor)] + [int(n) for n in re.findall(r"\d+", match.group("candidates"))],
+            "topic": clean_keywords(match.group("topic") or ""),
+        }
+
+    match = COMPARE_EN_PATTERN.match(user_command)
+    if match:
+        source1, first, source2, second = match.group(1, 2, 3, 4)
+        return {
+            "intent": "compare",
+            "sources": [_source(source1), _source(source2) or _source(source1)],
+            "indices": [int(first), int(second)],
+            "topic": clean_keywords(match.group("topic") or ""),
+        }
+
+    match = COMPARE_ZH_PATTERN.search(user_command)
+    if match:
+        source1, first, source2, second = match.group(1, 2, 3, 4)
+        indices = [parse_number(first), parse_number(second)]
+        if None not in indices:
+            return {
+                "intent": "compare",
+                "sources": [_source(source1), _source(source2) or _source(source1)],
+                "indices": indices,
+                "topic": (match.group("topic") or "").strip(),
+            }
+
+    match = SWEEP_PATTERN.match(user_command)
+    if match:
+        parsed = _search("arxiv", match.group("rest"))
+        if parsed:
+            parsed["intent"] = "arxiv_sweep"
+        return parsed
+
+    for pattern in (SEARCH_EN_PATTERN, SEARCH_ZH_PATTERN):
+        match = pattern.match(user_command)
+        if match:
+            source = next((g for g in match.groups()[:-1] if g), None)
+            return _search(_source(source), match.group("rest"))
+    return None
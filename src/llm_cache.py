@@ -0,0 +1,84 @@
+# src/llm_cache.py
+import hashlib
+import json
+import threading
+import time
+from .sqlite_cache import SQLiteCache
+
+
+class LLMCache(SQLiteCache):
+    """
+    On-disk cache of chat completion responses.
+
+    Keys are a SHA-256 over the model, messages, temperature and any other request
+    parameters, so identical prompts hit regardless of which process sent them. Entries
+    expire after ``ttl`` seconds; call sites listed in ``disabled_sites`` bypass the cache.
+    """
+
+    TABLE = "responses"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            call_site TEXT NOT NULL,
+            model TEXT NOT NULL,
+            content TEXT NOT NULL,
+            usage TEXT,
+            created REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=20000, disabled_sites=(), evict_every=64):
+        self.ttl = ttl
+        self.disabled_sites = set(disabled_sites)
+        self._site_stats = {}
+        self._site_lock = threading.Lock()
+        super().__init__(path, max_entries=max_entries, evict_every=evict_every)
+
+    @staticmethod
+    def make_key(model, messages, temperature, **params):
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "params": params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def enabled_for(self, call_site):
+        return call_site not in self.disabled_sites
+
+    def _count_site(self, call_site, name):
+        with self._site_lock:
+            stats = self._site_stats.setdefault(call_site, {"hits": 0, "misses": 0})
+            stats[name] += 1
+        self._count(name)
+
+    def get(self, call_site, key):
+        """Return ``(content, usage)`` for a fresh entry, or None."""
+        conn = self._conn()
+        row = conn.execute("SELECT content, usage, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row and time.time() - row[2] <= self.ttl:
+            self._touch([key])
+            self._count_site(call_site, "hits")
+            return row[0], json.loads(row[1]) if row[1] else None
+        if row:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+        self._count_site(call_site, "misses")
+        return None
+
+    def put(self, call_site, key, model, content, usage=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, call_site, model, content, usage, created, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, call_site, model, content, json.dumps(usage) if usage else None, now, now)
+        )
+        conn.commit()
+        self._after_write()
+
+    def site_stats(self):
+        """Return {call_site: {"hits", "misses"}} for this process."""
+        with self._site_lock:
+            return {site: dict(stats) for site, stats in self._site_stats.items()}
@@ -0,0 +1,135 @@
+# src/llm_client.py
+import logging
+import openai
+from openai import OpenAI
+from .llm_cache import LLMCache
+from .resilience import get_endpoint, parse_retry_after
+
+# Errors that say the API itself is unhealthy or throttling us, as opposed to a bad request.
+DEPENDENCY_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ChatClient:
+    """
+    Single entry point for chat completions, shared by every component that prompts GPT.
+
+    Each call names its ``call_site`` so caching can be switched off per site and hit
+    rates reported per site.
+    """
+
+    def __init__(self, client: OpenAI, cache: LLMCache = None):
+        self.client = client
+        self.cache = cache
+        self.endpoint = get_endpoint("openai")
+
+    def complete(self, call_site, model, messages, temperature, **params):
+        """
+        Run a chat completion, answering from the response cache when possible.
+
+        Returns:
+            str: The stripped message content of the first choice.
+        """
+        content, _, _ = self.complete_with_usage(call_site, model, messages, temperature, **params)
+        return content
+
+    def complete_with_usage(self, call_site, model, messages, temperature, **params):
+        """
+        Like ``complete`` but also report token usage.
+
+        Returns:
+            tuple: ``(content, usage, cached)`` where ``usage`` is the API's usage dict (or
+            None if unknown) and ``cached`` is True when no API call was made.
+        """
+        use_cache = self.cache is not None and self.cache.enabled_for(call_site)
+        key = None
+        if use_cache:
+            key = self.cache.make_key(model, messages, temperature, **params)
+            try:
+                cached = self.cache.get(call_site, key)
+            except Exception as e:
+                logger.warning(f"LLM cache read failed: {str(e)}")
+                cached = None
+            if cached is not None:
+                content, usage = cached
+                return content, usage, True
+        result = self._create(model=model, messages=messages, temperature=temperature, **params)
+        content = result.choices[0].message.content.strip()
+        usage = result.usage.model_dump() if getattr(result, "usage", None) else None
+        if use_cache:
+            try:
+                self.cache.put(call_site, key, model, content, usage)
+            except Exception as e:
+                logger.warning(f"LLM cache write failed: {str(e)}")
+        return content, usage, False
+
+    def stream(self, call_site, model, messages, temperature, **params):
+        """
+        Yield the completion text incrementally as the API streams it.
+
+        A cache hit yields the whole cached text as a single chunk. On a miss the deltas
+        are yielded as they arrive and the assembled text is cached once the stream ends,
+        under the same key ``complete`` uses, so streamed and blocking calls share entries.
+        """
+        use_cache = self.cache is not None and self.cache.enabled_for(call_site)
+        key = None
+        if use_cache:
+            key = self.cache.make_key(model, messages, temperature, **params)
+            try:
+                cached = self.cache.get(call_site, key)
+            except Exception as e:
+                logger.warning(f"LLM cache read failed: {str(e)}")
+                cached = None
+            if cached is not None:
+                yield cached[0]
+                return
+        stream = self._create(
+            model=model, messages=messages, temperature=temperature,
+            stream=True, stream_options={"include_usage": True}, **params
+        )
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage.model_dump()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except DEPENDENCY_ERRORS:
+            self.endpoint.record_failure()
+            raise
+        finally:
+            stream.close()
+        if use_cache:
+            try:
+                self.cache.put(call_site, key, model, "".join(parts).strip(), usage)
+            except Exception as e:
+                logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _create(self, **request):
+        """Call the API behind the shared OpenAI rate limiter and circuit breaker."""
+        self.endpoint.before_call()
+        try:
+            result = self.client.chat.completions.create(**request)
+        except DEPENDENCY_ERRORS as e:
+            response = getattr(e, "response", None)
+            retry_after = parse_retry_after(response.headers.get("retry-after")) if response is not None else None
+            self.endpoint.record_failure(retry_after=retry_after)
+            raise
+        except openai.APIStatusError:
+            # A 4xx reply (bad request, auth) means the API is up; it must not wedge a half-open trial.
+            self.endpoint.record_success()
+            raise
+        except Exception:
+            self.endpoint.breaker.release_trial()
+            raise
+        self.endpoint.record_success()
+        return result
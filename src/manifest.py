@@ -0,0 +1,119 @@
+# src/manifest.py
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """MD5 of a file's bytes, read in chunks so large PDFs are not loaded at once."""
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive inter-process lock on ``lock_path``, creating it if needed."""
+    directory = os.path.dirname(lock_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PDFManifest:
+    """
+    Persistent record of which PDF files are indexed, keyed by path.
+
+    Each entry stores the file size, mtime and content hash seen at index time, so a
+    later scan can skip unchanged files on ``stat`` alone and recognise renamed files by
+    their hash without re-extracting them.
+
+    Several processes (the app and the bulk-ingest CLI) may share one manifest file, so
+    writers hold ``locked()`` and ``reload()`` before changing it; otherwise the last
+    ``save()`` would drop the other process's entries.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.exists = False
+        self.reload()
+
+    def reload(self):
+        """Re-read the file, picking up entries written by other processes."""
+        self.exists = os.path.exists(self.path)
+        self.entries = {}
+        if self.exists:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @contextmanager
+    def locked(self):
+        """Hold an exclusive inter-process lock on the manifest for a read-modify-write."""
+        with file_lock(self.path + ".lock"):
+            yield self
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.normpath(file_path)
+
+    def get(self, file_path):
+        return self.entries.get(self._key(file_path))
+
+    def is_unchanged(self, file_path, stat):
+        entry = self.get(file_path)
+        return bool(entry) and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def record(self, file_path, stat, content_hash):
+        self.entries[self._key(file_path)] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": content_hash
+        }
+
+    def remove(self, file_path):
+        return self.entries.pop(self._key(file_path), None)
+
+    def paths(self):
+        return list(self.entries)
+
+    def paths_with_hash(self, content_hash):
+        return [path for path, entry in self.entries.items() if entry["content_hash"] == content_hash]
+
+    def hashes_in_use(self):
+        return {entry["content_hash"] for entry in self.entries.values()}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.exists = True
@@ -1,4 +1,5 @@
 from .database import Database
+from . import notify
 import streamlit as st
 from datetime import datetime
 import uuid
@@ -24,29 +25,38 @@ class MemoryManager:
 
     def remember_uploaded(self, paper_metadata: dict):
         """Store uploaded paper metadata and ensure it's in the database."""
-        file_hash = paper_metadata.get('file_hash')
-        if not file_hash:
-            st.warning("⚠️ 缺少檔案哈希，無法記錄上傳論文")
+        if not paper_metadata.get('file_hash'):
+            notify.warning("⚠️ 缺少檔案哈希，無法記錄上傳論文")
             return
-        if self.db.insert_metadata(
-            title=paper_metadata.get('title', 'Untitled'),
-            abstract=paper_metadata.get('abstract', '(No abstract)'),
-            file_hash=file_hash,
-            source=paper_metadata.get('source', 'internal_upload')
-        ):
-            st.success(f"✅ 已記錄上傳論文：{paper_metadata['title'][:40]}...")
-        paper_id = self._get_paper_id(file_hash)
-        if paper_id:
-            self.recent_papers.append({
-                "paper_id": paper_id,
-                "title": paper_metadata['title'],
-                "timestamp": datetime.now().isoformat()
-            })
+        self.remember_uploaded_many([paper_metadata])
+
+    def remember_uploaded_many(self, papers: list):
+        """Insert a batch of uploaded papers in one round-trip and remember them as recent."""
+        papers = [paper for paper in papers if paper.get('file_hash')]
+        if not papers:
+            return {}, {}
+        inserted, existing = self.db.insert_papers(papers)
+        if len(inserted) == 1:
+            title = next(p['title'] for p in papers if p['file_hash'] in inserted)
+            notify.success(f"✅ 已記錄上傳論文：{title[:40]}...")
+        elif inserted:
+            notify.success(f"✅ 已記錄 {len(inserted)} 篇上傳論文")
+        ids = {**existing, **inserted}
+        now = datetime.now().isoformat()
+        for paper in papers:
+            paper_id = ids.get(paper['file_hash'])
+            if paper_id:
+                self.recent_papers.append({
+                    "paper_id": paper_id,
+                    "title": paper.get('title', 'Untitled'),
+                    "timestamp": now
+                })
+        return inserted, existing
 
     def remember_search(self, search_result: list, session_key: str = None):
         """Store search results with a unique session key."""
         if not search_result:
-            st.warning("⚠️ 搜索結果為空，無法記錄")
+            notify.warning("⚠️ 搜索結果為空，無法記錄")
             return None
         if not session_key:
             session_key = f"search_{uuid.uuid4()}"
@@ -63,10 +73,7 @@ class MemoryManager:
 
     def _get_paper_id(self, file_hash):
         """Retrieve paper ID from database by file hash."""
-        with self.db.conn.cursor() as cur:
-            cur.execute("SELECT id FROM papers WHERE file_hash = %s", (file_hash,))
-            result = cur.fetchone()
-            return result[0] if result else None
+        return self.db.get_paper_id_by_hash(file_hash)
 
     def get_recent_papers(self, limit=10):
         """Retrieve recently accessed papers, supplemented by database."""
@@ -75,8 +82,9 @@ class MemoryManager:
             for item in self.recent_papers
             if (datetime.now() - datetime.fromisoformat(item['timestamp'])).days <= 30
         ]
-        db_papers = self.db.get_papers(limit=limit - len(recent))
-        recent.extend({"paper_id": pid, "title": title} for pid, title, _ in db_papers)
+        if len(recent) < limit:
+            db_papers, _ = self.db.list_papers(columns=("id", "title"), limit=limit - len(recent))
+            recent.extend({"paper_id": pid, "title": title} for pid, title in db_papers)
         return recent[:limit]
 
     def get_recent_searches(self, limit=5):
@@ -107,4 +115,36 @@ class MemoryManager:
                 return None
             paper = results[index - 1]
             return paper['title'], paper['abstract']
-        return None
\ No newline at end of file
+        return None
+
+    def get_library_papers(self, limit=100):
+        """Return up to ``limit`` (title, abstract) pairs from the local database, oldest first."""
+        rows, _ = self.db.list_papers(columns=("title", "abstract"), limit=limit)
+        return [(title, abstract) for title, abstract in rows]
+
+    def get_search_papers(self, session_key):
+        """Return (title, abstract) pairs for a remembered search, whatever its result shape."""
+        entry = self.search_results.get(session_key)
+        if not entry:
+            return []
+        papers = []
+        for result in entry['results']:
+            if isinstance(result, dict):
+                papers.append((result['title'], result['abstract']))
+            else:
+                title, abstract, _ = result
+                papers.append((title, abstract))
+        return papers
+
+    def get_papers_by_indices(self, indices, source="database"):
+        """Return {index: (title, abstract)} for the 1-based indices that exist in ``source``."""
+        if source == "database":
+            recent_papers = self.get_recent_papers(limit=max(indices, default=0))
+            ids = {i: recent_papers[i - 1]['paper_id'] for i in indices if 0 < i <= len(recent_papers)}
+            found = self.db.get_paper_map(list(ids.values()))
+            return {i: found[pid] for i, pid in ids.items() if pid in found}
+        if source == "web":
+            last_search = st.session_state.get('last_web_search')
+            papers = self.get_search_papers(last_search['key']) if last_search else []
+            return {i: papers[i - 1] for i in indices if 0 < i <= len(papers)}
+        return {}
@@ -1,157 +1,133 @@
 import json
-import re
 from openai import OpenAI
 from .config import get_openai_client
-import numpy as np
+from .llm_client import ChatClient
+from .intent_parser import fast_parse, clean_keywords
 import streamlit as st
-import tenacity
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default result count for "sweep arxiv for ..." when no "max N" is given.
+SWEEP_DEFAULT_RESULTS = 200
+# Default number of local papers surveyed by "compare all local papers".
+MATRIX_DEFAULT_PAPERS = 50
+
 class NLPProcessor:
-    def __init__(self):
+    def __init__(self, chat: ChatClient = None):
         self.client = get_openai_client()
+        self.chat = chat or ChatClient(self.client)
 
     def parse_user_intent(self, user_command):
-        cmd_lower = user_command.lower()
-        if "本地論文清單" in cmd_lower:
-            return "/history", None
-        elif "比較" in cmd_lower and any(kw in cmd_lower for kw in ["篇", "第"]):
-            indices = self.extract_compare_indices(user_command)
-            topic = self.extract_compare_topic(user_command)
-            if len(indices) == 2:
-                if any(kw in cmd_lower for kw in ["arxiv", "arXiv"]) and any(kw in cmd_lower for kw in ["本地", "local"]):
-                    last_topic = st.session_state.get('last_search_keyword', topic)
-                    return "compare_arxiv_local", (indices, last_topic or topic)
-                if 'last_web_search' in st.session_state or any(kw in cmd_lower for kw in ["arxiv", "semantic", "web", "剛剛", "查詢"]):
-                    last_topic = st.session_state.get('last_search_keyword', topic)
-                    return "compare_web_results", (indices, last_topic or topic)
-                return "compare_custom", (indices, topic)
-            return "compare", topic if topic else "diffusion" if "diffusion" in cmd_lower else ""
-        elif any(kw in cmd_lower for kw in ["arxiv", "arxiv查詢", "查arxiv"]):
-            keyword = self.extract_arxiv_keywords(user_command)
-            st.session_state['last_search_keyword'] = keyword
-            return "arxiv_search", keyword
-        elif any(kw in cmd_lower for kw in ["semantic scholar", "semantic查詢", "查semantic"]):
-            keyword, max_results, days = self.extract_semantic_params(user_command)
-            st.session_state['last_search_keyword'] = keyword
-            return "semantic_search", (keyword, max_results, days)
-        elif any(kw in cmd_lower for kw in ["摘要", "查詢", "有哪些", "上傳的", "本地"]):
-            keyword, embedding = self.extract_local_query_params(user_command)
-            st.session_state['last_search_keyword'] = keyword
-            return "local_query", (keyword, embedding)
-        elif "arxiv" in cmd_lower and "比較" in cmd_lower:
-            keyword = self.extract_arxiv_keywords(user_command)
-            local_indices = self.extract_compare_indices(user_command)
-            if len(local_indices) == 1:
-                st.session_state['last_search_keyword'] = keyword
-                return "arxiv_vs_local_compare", (keyword, local_indices[0])
-        return "unknown", user_command
-
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=4, max=10), stop=tenacity.stop_after_attempt(3))
-    def extract_compare_indices(self, user_command):
-        prompt = f"""
-        請從下面指令中找出要比較的論文編號，區分 arXiv 和本地論文。
-        - 如果指令包含 'arxiv' 和 '本地'，提取兩個編號：第一個為 arXiv 論文編號，第二個為本地論文編號。
-        - 否則，假設兩個編號均為同一來源（例如 arXiv 或本地）。
-        - 以 JSON 格式回應，例如：{{"compare": [2, 6]}}，其中 [2, 6] 表示 arXiv 第2篇和本地第6篇，或同來源的第2篇和第6篇。
-        指令：{user_command}
         """
-        try:
-            result = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "你是一個語意理解助手，能從自然語言中找出要比較的論文編號。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-            content = result.choices[0].message.content.strip()
-            json_data = json.loads(content)
-            if "compare" in json_data and isinstance(json_data["compare"], list):
-                return [int(i) for i in json_data["compare"] if str(i).isdigit()]
-            logger.error(f"Invalid indices format: {content}")
-            st.warning("⚠️ 無法解析比較編號，請明確指定編號（例如：比較 arxiv 第2篇與本地第6篇）")
-            return []
-        except Exception as e:
-            logger.error(f"Extract indices failed: {str(e)}")
-            st.warning("⚠️ 無法解析比較編號，請明確指定編號（例如：比較 arxiv 第2篇與本地第6篇）")
-            return []
+        Map a command to ``(intent, params)``.
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=4, max=10), stop=tenacity.stop_after_attempt(3))
-    def extract_compare_topic(self, user_command):
-        prompt = f"使用者輸入：'{user_command}'\n請從中擷取比較的主題或關鍵詞（例如 'transformer'），若無明確主題則回傳空字串，僅輸出主題詞，不要加說明或句號。"
-        try:
-            result = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "你是一個擅長從句子中提取主題的語意分析員。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2
-            )
-            topic = result.choices[0].message.content.strip()
-            return topic if topic else ""
-        except Exception as e:
-            logger.error(f"Extract topic failed: {str(e)}")
-            return ""
+        Documented command forms are resolved locally by ``fast_parse``; anything else
+        costs one combined JSON-mode LLM call. If that fails, the command is routed by
+        source keywords with locally extracted search terms.
+        """
+        parsed = fast_parse(user_command)
+        if parsed is None:
+            parsed = self.parse_intent_with_llm(user_command) or self._route_by_keywords(user_command)
+        return self._resolve_intent(user_command, parsed)
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=4, max=10), stop=tenacity.stop_after_attempt(3))
-    def extract_arxiv_keywords(self, user_command):
+    def parse_intent_with_llm(self, user_command):
         prompt = f"""
-        使用者輸入：'{user_command}'
-        請從中擷取適合用於 arXiv 或 Semantic Scholar 查詢的英文關鍵字或主題，僅輸出主題詞（多詞用空格分隔）。
-        排除來源詞（如 'arxiv', 'semantic', 'scholar', '查詢', '查'），不要加說明或句號。
-        若無明確主題，返回 'general'。
+        請解析下面的指令，以 JSON 物件回應，欄位如下：
+        - "intent"：只能是 "history"、"arxiv_search"、"semantic_search"、"federated_search"（同時查 arXiv 與 Semantic Scholar）、"local_query"、"compare"、"unknown" 之一。
+        - "sources"：比較時兩篇論文各自的來源（"arxiv"、"semantic"、"local" 或 null），例如 ["arxiv", "local"]。
+        - "indices"：比較時的論文編號（整數陣列），例如 "比較 arxiv 第2篇與本地第6篇" 為 [2, 6]；一篇與多篇比較時第一個為基準，例如 "比較第1篇與第2、3、4篇" 為 [1, 2, 3, 4]。
+        - "topic"：比較的主題，沒有則為空字串。
+        - "keywords"：適合用於 arXiv 或 Semantic Scholar 查詢的英文關鍵字（多詞用空格分隔），不含來源詞；若無明確主題為 "general"。
+        - "max_results"：指定的最多筆數，沒有則為 null。
+        - "days"：指定的最近天數，沒有則為 null。
+        指令：{user_command}
         """
         try:
-            result = self.client.chat.completions.create(
+            content = self.chat.complete(
+                "nlp.parse_intent",
                 model="gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": "你是一個擅長從句子中提取主題的語意分析員。"},
+                    {"role": "system", "content": "你是一個語意理解助手，負責把論文助手的自然語言指令解析成結構化 JSON。"},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.2
+                temperature=0.0,
+                response_format={"type": "json_object"}
             )
-            keywords = result.choices[0].message.content.strip()
-            exclude_words = {'arxiv', 'semantic', 'scholar', 'query', 'search', '查詢', '查'}
-            cleaned_keywords = ' '.join(word for word in keywords.lower().split() if word not in exclude_words)
-            return cleaned_keywords if cleaned_keywords else "general"
+            parsed = json.loads(content)
+            if not isinstance(parsed, dict) or "intent" not in parsed:
+                logger.error(f"Invalid intent format: {content}")
+                return None
+            parsed["indices"] = [int(i) for i in parsed.get("indices") or [] if str(i).isdigit()]
+            parsed["keywords"] = clean_keywords(parsed.get("keywords") or "") or "general"
+            return parsed
         except Exception as e:
-            logger.error(f"Extract keywords failed: {str(e)}")
-            words = user_command.lower().split()
-            query_words = ["查詢", "查", "找", "搜尋", "關於"]
-            for i, word in enumerate(words):
-                if word in query_words and i + 1 < len(words):
-                    candidate = " ".join(words[i+1:i+3]) if i + 2 < len(words) else words[i+1]
-                    cleaned = ' '.join(w for w in candidate.split() if w not in exclude_words)
-                    return cleaned if cleaned else "general"
-            return "general"
+            logger.error(f"Parse intent failed: {str(e)}")
+            return None
 
-    def extract_semantic_params(self, user_command):
-        max_results = 5
-        days = None
-        max_match = re.search(r"(?:最多|maximum|max)\s*(\d+)\s*(?:筆|results?)", user_command, re.IGNORECASE)
-        if max_match:
-            max_results = int(max_match.group(1))
-        days_match = re.search(r"(?:最近|last)\s*(\d+)\s*(?:天|days?)", user_command, re.IGNORECASE)
-        if days_match:
-            days = int(days_match.group(1))
-        keyword = self.extract_arxiv_keywords(user_command)
-        return keyword, max_results, days
+    def _route_by_keywords(self, user_command):
+        """Offline fallback: pick the intent from source keywords and keep the remaining words."""
+        cmd_lower = user_command.lower()
+        keywords = clean_keywords(user_command) or "general"
+        if any(kw in cmd_lower for kw in ["arxiv", "arxiv查詢", "查arxiv"]):
+            return {"intent": "arxiv_search", "keywords": keywords}
+        if any(kw in cmd_lower for kw in ["semantic scholar", "semantic查詢", "查semantic"]):
+            return {"intent": "semantic_search", "keywords": keywords}
+        if any(kw in cmd_lower for kw in ["摘要", "查詢", "有哪些", "上傳的", "本地"]):
+            return {"intent": "local_query", "keywords": keywords}
+        return {"intent": "unknown"}
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=4, max=10), stop=tenacity.stop_after_attempt(3))
-    def extract_local_query_params(self, user_command):
-        keyword = self.extract_arxiv_keywords(user_command)
-        try:
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=user_command
-            )
-            embedding = response.data[0].embedding
-        except Exception as e:
-            logger.error(f"Extract embedding failed: {str(e)}")
-            embedding = None
-        return keyword, embedding
\ No newline at end of file
+    def _resolve_intent(self, user_command, parsed):
+        """Turn a parsed command into the ``(intent, params)`` tuples the UI dispatches on."""
+        intent = parsed.get("intent")
+        keyword = parsed.get("keywords") or "general"
+        if intent == "history":
+            return "/history", None
+        if intent == "compare_matrix":
+            source = (parsed.get("sources") or [None])[0]
+            if source is None:
+                source = "web" if 'last_web_search' in st.session_state else "local"
+            elif source != "local":
+                source = "web"
+            return "compare_matrix", (source, parsed.get("max_results") or MATRIX_DEFAULT_PAPERS)
+        if intent == "compare":
+            indices = parsed.get("indices") or []
+            topic = parsed.get("topic") or ""
+            sources = (list(parsed.get("sources") or []) + [None, None])[:2]
+            if len(indices) > 2:
+                # One anchor against several candidates, all from the same list.
+                source = sources[1] or sources[0]
+                if source in ("arxiv", "semantic", "web", "all") or (source is None and 'last_web_search' in st.session_state):
+                    source = "web"
+                else:
+                    source = "database"
+                return "compare_batch", (source, indices[0], indices[1:], topic)
+            if len(indices) == 2:
+                if "arxiv" in sources and "local" in sources:
+                    if sources[0] == "local":
+                        indices = [indices[1], indices[0]]
+                    last_topic = st.session_state.get('last_search_keyword', topic)
+                    return "compare_arxiv_local", (indices, last_topic or topic)
+                web_source = sources[0] in ("arxiv", "semantic", "web")
+                if web_source or (sources[0] is None and 'last_web_search' in st.session_state):
+                    last_topic = st.session_state.get('last_search_keyword', topic)
+                    return "compare_web_results", (indices, last_topic or topic)
+                return "compare_custom", (indices, topic)
+            if len(indices) == 1 and "arxiv" in sources and keyword != "general":
+                st.session_state['last_search_keyword'] = keyword
+                return "arxiv_vs_local_compare", (keyword, indices[0])
+            return "compare", topic or ("diffusion" if "diffusion" in user_command.lower() else "")
+        if intent == "arxiv_search":
+            st.session_state['last_search_keyword'] = keyword
+            return "arxiv_search", keyword
+        if intent == "arxiv_sweep":
+            st.session_state['last_search_keyword'] = keyword
+            return "arxiv_sweep", (keyword, parsed.get("max_results") or SWEEP_DEFAULT_RESULTS)
+        if intent in ("semantic_search", "federated_search"):
+            st.session_state['last_search_keyword'] = keyword
+            return intent, (keyword, parsed.get("max_results") or 5, parsed.get("days"))
+        if intent == "local_query":
+            st.session_state['last_search_keyword'] = keyword
+            return "local_query", keyword
+        return "unknown", user_command
@@ -0,0 +1,51 @@
+# src/notify.py
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_LEVELS = {"error": logging.ERROR, "warning": logging.WARNING, "success": logging.INFO, "info": logging.INFO}
+
+
+def in_streamlit_script():
+    """True when called from a Streamlit script thread that can draw on the page."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return False
+    try:
+        return get_script_run_ctx(suppress_warning=True) is not None
+    except TypeError:
+        # Older Streamlit releases have no suppress_warning parameter.
+        return get_script_run_ctx() is not None
+
+
+def notify(level, message):
+    """
+    Report a status message to the user.
+
+    Inside a page render this is ``st.error``/``st.warning``/``st.success``/``st.info``;
+    from the CLI, worker threads or tests the message goes to the log instead, so
+    components can be used without a running Streamlit app.
+    """
+    if in_streamlit_script():
+        import streamlit as st
+        getattr(st, level)(message)
+    else:
+        logger.log(_LEVELS[level], message)
+
+
+def error(message):
+    notify("error", message)
+
+
+def warning(message):
+    notify("warning", message)
+
+
+def success(message):
+    notify("success", message)
+
+
+def info(message):
+    notify("info", message)
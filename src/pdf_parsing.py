@@ -0,0 +1,138 @@
+# src/pdf_parsing.py
+# Kept free of the app's heavy dependencies (torch, chromadb, openai, psycopg2): ingestion
+# worker processes import this module to unpickle prepare_pdf.
+import fitz
+
+# Title spans smaller than this (in points) are body text even if they are the largest on the page.
+MIN_TITLE_FONT_SIZE = 11
+
+
+class ParsedPDF:
+    """
+    Lazily parsed PDF shared by metadata extraction and indexing.
+
+    Page texts are extracted on first access and cached, so reading the header for the
+    title and abstract touches only the first pages, and ``pages``/``full_text`` are only
+    produced when indexing asks for them. The document is opened on demand from the
+    bytes or path it was created with and can be closed early to free memory.
+
+    Pickling keeps the extracted text but drops the open document and the raw bytes,
+    so a ParsedPDF prepared in a worker process is cheap to send back; call ``attach``
+    with the bytes if pages that were not extracted there are needed later.
+    """
+
+    def __init__(self, data=None, path=None, header_pages=2, max_header_pages=6):
+        if data is None and path is None:
+            raise ValueError("ParsedPDF needs either data or path")
+        self.data = data
+        self.path = path
+        self.header_pages = header_pages
+        self.max_header_pages = max_header_pages
+        self._doc = None
+        self._page_count = None
+        self._font_title = None
+        self._page_texts = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__, _doc=None)
+        state["data"] = None
+        return state
+
+    def attach(self, data):
+        """Give a ParsedPDF received from another process its bytes back."""
+        self.data = data
+        return self
+
+    @property
+    def document(self):
+        if self._doc is None:
+            self._doc = fitz.open(stream=self.data, filetype="pdf") if self.data is not None else fitz.open(self.path)
+        return self._doc
+
+    @property
+    def page_count(self):
+        if self._page_count is None:
+            self._page_count = self.document.page_count
+        return self._page_count
+
+    def page_text(self, index):
+        text = self._page_texts.get(index)
+        if text is None:
+            text = self._page_texts[index] = self.document.load_page(index).get_text()
+        return text
+
+    def header_text(self):
+        """Text of the first pages, read one more page at a time until "abstract" appears."""
+        limit = min(self.page_count, self.max_header_pages)
+        count = min(self.header_pages, limit)
+        text = "\n".join(self.page_text(i) for i in range(count))
+        while count < limit and "abstract" not in text.lower():
+            text += "\n" + self.page_text(count)
+            count += 1
+        return text
+
+    @property
+    def pages(self):
+        """Text of every page, extracted on first use."""
+        return [self.page_text(i) for i in range(self.page_count)]
+
+    @property
+    def full_text(self):
+        return "\n".join(self.pages)
+
+    def title_from_fonts(self):
+        """Join the spans set in the largest font on the first page, or return '' if none stands out."""
+        if self._font_title is None:
+            self._font_title = self._find_font_title() if self.page_count else ""
+        return self._font_title
+
+    def _find_font_title(self):
+        lines = []
+        for block in self.document.load_page(0).get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                text = "".join(span["text"] for span in line["spans"]).strip()
+                if len(text) >= 3 and not text.lower().startswith(("arxiv:", "abstract")):
+                    lines.append((max(span["size"] for span in line["spans"]), text))
+        if not lines:
+            return ""
+        largest = max(size for size, _ in lines)
+        if largest < MIN_TITLE_FONT_SIZE:
+            return ""
+        title_lines = [text for size, text in lines if size >= largest - 0.5]
+        return " ".join(title_lines)[:200]
+
+    def preview_png(self, zoom=2):
+        return self.document.load_page(0).get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+
+    def close(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def prepare_pdf(data=None, path=None, with_pages=False, preview_zoom=None):
+    """
+    Pre-parse one PDF; runs in a worker process.
+
+    Reads the header pages and the font-size title cue (plus every page when the file
+    will be indexed) so the parent only does the I/O-bound steps.
+
+    Returns:
+        tuple: (ParsedPDF without its bytes, PNG preview or None).
+    """
+    parsed = ParsedPDF(data=data, path=path)
+    try:
+        parsed.header_text()
+        parsed.title_from_fonts()
+        if with_pages:
+            parsed.pages
+        preview = parsed.preview_png(preview_zoom) if preview_zoom and parsed.page_count else None
+    finally:
+        parsed.close()
+    return parsed, preview
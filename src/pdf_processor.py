@@ -2,37 +2,54 @@ import fitz
 import hashlib
 from openai import OpenAI
 from .config import get_openai_client
-import streamlit as st
+from .llm_client import ChatClient
+from .abstract_validator import AbstractValidator
+from .pdf_parsing import ParsedPDF
+from . import notify
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, chat: ChatClient = None, validator: AbstractValidator = None):
         self.client = get_openai_client()
+        self.chat = chat or ChatClient(self.client)
+        self.validator = validator or AbstractValidator(chat=self.chat)
 
-    def extract_title_abstract(self, pdf_bytes):
+    def parse(self, pdf_bytes=None, path=None):
+        return ParsedPDF(data=pdf_bytes, path=path)
+
+    def extract_title_abstract(self, pdf_bytes=None, parsed: ParsedPDF = None):
+        """
+        Find the title and abstract from the first pages only.
+
+        Returns:
+            tuple: (title, abstract, parsed) where ``parsed`` is the ParsedPDF, reusable
+            for indexing without parsing the file again.
+        """
+        parsed = parsed or self.parse(pdf_bytes)
         try:
-            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                full_text = "\n".join([page.get_text() for page in doc])
+            header_text = parsed.header_text()
+            font_title = parsed.title_from_fonts()
         except Exception as e:
-            st.error(f"❌ 無法解析 PDF：{str(e)}")
-            return "Untitled", "(No valid abstract found.)", ""
-        lines = full_text.strip().split("\n")
-        title = ""
-        for i, line in enumerate(lines[:5]):
-            if len(line) > 10 and not line.lower().startswith(("abstract", "keywords")):
-                title = line[:200]
-                break
+            notify.error(f"❌ 無法解析 PDF：{str(e)}")
+            return "Untitled", "(No valid abstract found.)", parsed
+        lines = header_text.strip().split("\n")
+        title = font_title
+        if not title:
+            for i, line in enumerate(lines[:5]):
+                if len(line) > 10 and not line.lower().startswith(("abstract", "keywords")):
+                    title = line[:200]
+                    break
         if not title:
             title = "Untitled"
         abstract = ""
         abstract_source = "fallback"
-        lowered = full_text.lower()
+        lowered = header_text.lower()
         if "abstract" in lowered:
             idx = lowered.find("abstract")
-            rest = full_text[idx + len("abstract"):].strip()
+            rest = header_text[idx + len("abstract"):].strip()
             after = rest.split("\n", 1)
             if len(after) > 1 and after[1].strip():
                 candidate = after[1].strip().split("\n\n")[0].strip()
-                if self.is_valid_abstract(candidate):
+                if self.is_valid_abstract(candidate, after_heading=True):
                     abstract = candidate
                     abstract_source = "header"
         if not abstract:
@@ -42,25 +59,10 @@ class PDFProcessor:
             else:
                 abstract = "(No valid abstract found.)"
                 abstract_source = "invalid"
-        return title.strip() + f" ({abstract_source})", abstract.strip(), full_text
+        return title.strip() + f" ({abstract_source})", abstract.strip(), parsed
 
-    def is_valid_abstract(self, text):
-        if not text or len(text) < 50:
-            return False
-        prompt = f"Please check if the following paragraph is likely to be a valid research abstract.\nRespond only 'yes' or 'no'.\n\n{text}"
-        try:
-            result = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert in academic writing."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0
-            )
-            return "yes" in result.choices[0].message.content.lower()
-        except Exception:
-            # Fallback: Check length and basic structure
-            return len(text) > 100 and any(kw in text.lower() for kw in ["propose", "method", "results", "approach"])
+    def is_valid_abstract(self, text, after_heading=False):
+        return self.validator.is_valid(text, after_heading=after_heading)
 
     def get_file_hash(self, file_bytes):
         return hashlib.md5(file_bytes).hexdigest()
\ No newline at end of file
@@ -0,0 +1,202 @@
+# src/registry.py
+import atexit
+import logging
+import os
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROCESS = "process"
+SESSION = "session"
+
+
+class ComponentRegistry:
+    """
+    Lazily build heavy components once and keep them for their declared lifetime.
+
+    A component registered with the ``process`` lifetime is built on first use and
+    shared by every Streamlit session and rerun in this process. A ``session``
+    component is built once per session and stored in the mapping passed as
+    ``scope`` (normally ``st.session_state``). Shutdown hooks run in reverse build
+    order when the process exits or ``shutdown()`` is called.
+
+    Built process components are returned without locking. Builds are serialized per
+    component, so a slow first build (the vector store) blocks only callers waiting for
+    that component, not sessions using ones that already exist.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._instances = {}
+        self._build_order = []
+        self._build_times = {}
+        self._lock = threading.RLock()
+        self._build_locks = {}
+        self._local = threading.local()
+        self._closed = False
+        atexit.register(self.shutdown)
+
+    def register(self, name, factory, lifetime=PROCESS, shutdown=None):
+        """
+        Register a component factory.
+
+        Args:
+            name (str): Component name used with ``get``.
+            factory (callable): Called as ``factory(registry)`` so it can resolve dependencies.
+            lifetime (str): ``"process"`` or ``"session"``.
+            shutdown (callable, optional): Called with the instance when it is torn down.
+        """
+        if lifetime not in (PROCESS, SESSION):
+            raise ValueError(f"Unknown lifetime: {lifetime}")
+        with self._lock:
+            self._specs[name] = {"factory": factory, "lifetime": lifetime, "shutdown": shutdown}
+
+    def get(self, name, scope=None):
+        """Return the component, building it on first access."""
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Component not registered: {name}")
+        if spec["lifetime"] == SESSION:
+            if scope is None:
+                raise ValueError(f"Component '{name}' has session lifetime and needs a scope")
+            key = f"_component_{name}"
+            if key not in scope:
+                scope[key] = self._build(name, spec)
+            return scope[key]
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Component registry has been shut down")
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        with build_lock:
+            # Another thread may have finished the build while this one waited.
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Component registry has been shut down")
+                if name in self._instances:
+                    return self._instances[name]
+            instance = self._build(name, spec)
+            with self._lock:
+                if not self._closed:
+                    self._instances[name] = instance
+                    self._build_order.append(name)
+                    return instance
+            # Shut down while building: nothing will run this instance's hook later.
+            if spec["shutdown"] is not None:
+                spec["shutdown"](instance)
+            raise RuntimeError("Component registry has been shut down")
+
+    def _build(self, name, spec):
+        # Dependencies built from inside a factory are timed separately, so each
+        # entry reports only the component's own construction cost.
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            instance = spec["factory"](self)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+        elapsed = total - nested
+        self._build_times[name] = elapsed
+        logger.info(f"Built component '{name}' in {elapsed * 1000:.0f} ms")
+        return instance
+
+    def build_times(self):
+        """Return a copy of ``{name: seconds}`` for every component built so far."""
+        return dict(self._build_times)
+
+    def shutdown(self):
+        """Run shutdown hooks for process components in reverse build order."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for name in reversed(self._build_order):
+                hook = self._specs[name]["shutdown"]
+                if hook is None:
+                    continue
+                try:
+                    hook(self._instances[name])
+                    logger.info(f"Shut down component '{name}'")
+                except Exception as e:
+                    logger.error(f"Shutdown of '{name}' failed: {str(e)}")
+            self._instances.clear()
+            self._build_order.clear()
+
+
+def build_default_registry():
+    """Register the application's components with their lifetimes and shutdown hooks."""
+    from .database import Database
+    from .embeddings import EmbeddingService
+    from .embedding_cache import EmbeddingCache
+    from .llm_cache import LLMCache
+    from .http_client import HttpClient, HTTPCache
+    from .llm_client import ChatClient
+    from .config import (
+        CACHE_DIR, HTTP_CACHE_TTL, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_DISABLED_SITES,
+        EMBEDDING_CACHE_MAX_ENTRIES,
+        ABSTRACT_UNCERTAIN_LOW, ABSTRACT_UNCERTAIN_HIGH, INGEST_PROCESS_WORKERS, INGEST_THREAD_WORKERS,
+        get_openai_client
+    )
+    from .abstract_validator import AbstractValidator
+    from .pdf_processor import PDFProcessor
+    from .nlp import NLPProcessor
+    from .web_search import WebSearch
+    from .compare import PaperComparator
+    from .vector_store import VectorStore
+    from .memory_manager import MemoryManager
+    from .ingest import IngestPipeline
+
+    registry = ComponentRegistry()
+    registry.register("db", lambda r: Database(), shutdown=lambda db: db.close())
+    registry.register("embedding_cache", lambda r: EmbeddingCache(
+        os.path.join(CACHE_DIR, "embeddings.sqlite"),
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+    ))
+    registry.register("embeddings", lambda r: EmbeddingService(disk_cache=r.get("embedding_cache")))
+    registry.register("llm_cache", lambda r: LLMCache(
+        os.path.join(CACHE_DIR, "llm_responses.sqlite"),
+        ttl=LLM_CACHE_TTL,
+        max_entries=LLM_CACHE_MAX_ENTRIES,
+        disabled_sites=LLM_CACHE_DISABLED_SITES
+    ))
+    registry.register("chat", lambda r: ChatClient(get_openai_client(), cache=r.get("llm_cache")))
+    registry.register("abstract_validator", lambda r: AbstractValidator(
+        r.get("embeddings"),
+        chat=r.get("chat"),
+        reference_loader=lambda: r.get("db").get_reference_abstracts(),
+        lower=ABSTRACT_UNCERTAIN_LOW,
+        upper=ABSTRACT_UNCERTAIN_HIGH
+    ))
+    registry.register("processor", lambda r: PDFProcessor(chat=r.get("chat"), validator=r.get("abstract_validator")))
+    registry.register("nlp", lambda r: NLPProcessor(chat=r.get("chat")))
+    registry.register("http", lambda r: HttpClient(
+        cache=HTTPCache(os.path.join(CACHE_DIR, "http_responses.sqlite"), max_entries=5000),
+        ttl=HTTP_CACHE_TTL
+    ))
+    registry.register("web_search", lambda r: WebSearch(r.get("http")), shutdown=lambda ws: ws.close())
+    registry.register("comparator", lambda r: PaperComparator(r.get("embeddings"), chat=r.get("chat")))
+    registry.register("vector_store", lambda r: VectorStore(r.get("db"), r.get("embeddings")))
+    def ingest_pipeline(r, vector_store):
+        return IngestPipeline(
+            r.get("db"),
+            r.get("processor"),
+            vector_store,
+            process_workers=INGEST_PROCESS_WORKERS or None,
+            thread_workers=INGEST_THREAD_WORKERS
+        )
+
+    registry.register("ingest", lambda r: ingest_pipeline(r, r.get("vector_store")), shutdown=lambda pipeline: pipeline.close())
+    # Postgres only: never builds the vector store, so no model load or Chroma sync.
+    registry.register("metadata_ingest", lambda r: ingest_pipeline(r, None), shutdown=lambda pipeline: pipeline.close())
+    registry.register("memory_manager", lambda r: MemoryManager(r.get("db")), lifetime=SESSION)
+    return registry
@@ -0,0 +1,196 @@
+# src/resilience.py
+import email.utils
+import logging
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Documented limits: arXiv asks for at most one request every 3 seconds; Semantic Scholar
+# grants 1 request/second per API key (unauthenticated traffic shares a stricter pool).
+DEFAULT_LIMITS = {
+    "export.arxiv.org": {"rate": 1 / 3, "capacity": 1},
+    "api.semanticscholar.org": {"rate": 1.0, "capacity": 1},
+    "openai": {"rate": 5.0, "capacity": 10},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a token could not be acquired within the caller's timeout."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``defer`` pauses issuing tokens, e.g. for Retry-After."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; raises RateLimitTimeout after ``timeout`` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"rate limit wait of {wait:.1f}s exceeds timeout")
+            time.sleep(wait)
+
+    def defer(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def blocked_for(self):
+        with self._lock:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls fail
+    fast for ``reset_timeout`` seconds. One trial call is then let through (half-open);
+    its success closes the circuit, its failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == OPEN or (self._state == HALF_OPEN and self._trial_in_flight):
+                self._stats["rejected"] += 1
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+                raise CircuitOpenError(f"{self.name} is unavailable; retrying in {retry_in:.0f}s")
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = True
+
+    def release_trial(self):
+        """Give back a half-open trial slot when the call never reached the dependency."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self._state, "consecutive_failures": self._failures, **self._stats}
+
+
+class Endpoint:
+    """Rate limiter and circuit breaker guarding one external dependency."""
+
+    def __init__(self, name, rate, capacity, failure_threshold=3, reset_timeout=60.0, acquire_timeout=15.0):
+        self.name = name
+        self.limiter = TokenBucket(rate, capacity)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.acquire_timeout = acquire_timeout
+
+    def before_call(self):
+        """Fail fast if the circuit is open, otherwise wait for a rate-limit token."""
+        self.breaker.before_call()
+        try:
+            self.limiter.acquire(timeout=self.acquire_timeout)
+        except RateLimitTimeout:
+            # Waiting on our own limiter says nothing about the dependency's health.
+            self.breaker.release_trial()
+            raise
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, retry_after=None):
+        if retry_after:
+            self.limiter.defer(retry_after)
+        self.breaker.record_failure()
+
+    def snapshot(self):
+        return {"name": self.name, "blocked_for": self.limiter.blocked_for(), **self.breaker.snapshot()}
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name):
+    """Return the process-wide Endpoint for ``name`` (a host name or a service key like "openai")."""
+    with _endpoints_lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            limits = DEFAULT_LIMITS.get(name, {"rate": 5.0, "capacity": 5})
+            endpoint = _endpoints[name] = Endpoint(name, **limits)
+        return endpoint
+
+
+def endpoint_states():
+    """Snapshot of every endpoint's breaker and limiter, for monitoring."""
+    with _endpoints_lock:
+        endpoints = list(_endpoints.values())
+    return [endpoint.snapshot() for endpoint in endpoints]
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given as seconds or an HTTP date; returns seconds or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,94 @@
+# src/sqlite_cache.py
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCache:
+    """
+    Base for small on-disk caches shared by every process on the machine.
+
+    Each thread gets its own connection to a WAL-mode SQLite file, so readers in one
+    process never block writers in another. Subclasses declare their table in
+    ``SCHEMA``; every table must have ``key`` and ``last_access`` columns so the base
+    class can evict least-recently-used rows once ``max_entries`` is exceeded.
+    """
+
+    TABLE = None
+    SCHEMA = None
+
+    def __init__(self, path, max_entries=100000, evict_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._writes_since_evict = 0
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _touch(self, keys):
+        """Mark ``keys`` as recently used."""
+        if keys:
+            now = time.time()
+            conn = self._conn()
+            conn.executemany(f"UPDATE {self.TABLE} SET last_access = ? WHERE key = ?", [(now, key) for key in keys])
+            conn.commit()
+
+    def _after_write(self, count=1):
+        self._count("writes", count)
+        with self._stats_lock:
+            self._writes_since_evict += count
+            due = self._writes_since_evict >= self.evict_every
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Delete least-recently-used rows beyond ``max_entries``; returns the number removed."""
+        conn = self._conn()
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()
+        excess = total - self.max_entries
+        if excess <= 0:
+            return 0
+        conn.execute(
+            f"DELETE FROM {self.TABLE} WHERE key IN (SELECT key FROM {self.TABLE} ORDER BY last_access LIMIT ?)",
+            (excess,)
+        )
+        conn.commit()
+        self._count("evictions", excess)
+        return excess
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute(f"DELETE FROM {self.TABLE}")
+        conn.commit()
+
+    def stats(self):
+        """Return hit/miss/write/eviction counters for this process plus the hit rate."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        (stats["entries"],) = self._conn().execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()
+        return stats
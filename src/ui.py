@@ -6,17 +6,32 @@ from reportlab.lib.units import inch
 from datetime import datetime
 import os
 import re
+import time
 import uuid
 import textwrap
 import unicodedata
 from .database import Database
 from .pdf_processor import PDFProcessor
 from .vector_store import VectorStore
-from .web_search import WebSearch
+from .web_search import WebSearch, SearchQuery, SearchError
 from .compare import PaperComparator
 from .nlp import NLPProcessor
 from .memory_manager import MemoryManager
-import fitz
+from .ingest import IngestPipeline, IngestItem
+from .resilience import endpoint_states
+
+# Papers per page in the sidebar download picker.
+DOWNLOAD_PAGE_SIZE = 100
+
+def render_comparison_stream(comparator, abstract1, abstract2, topic=None):
+    """Render a comparison as it streams in and return the assembled text for export."""
+    st.markdown("### 📋 Comparison Result:")
+    stream = comparator.compare_abstracts_stream(abstract1, abstract2, topic)
+    st.markdown(f"**Semantic Similarity**: {stream.similarity:.2f} (0 to 1, 1 is identical)")
+    st.write_stream(stream)
+    if stream.ttft is not None:
+        st.caption(f"First token after {stream.ttft:.2f}s")
+    return stream.text
 
 def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comparator: PaperComparator, vector_store: VectorStore, memory_manager: MemoryManager):
     st.header("🧠 Natural Language Command (Agent Mode)")
@@ -110,11 +125,15 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                 "local_query": "Local Database",
                 "arxiv_search": "arXiv",
                 "semantic_search": "Semantic Scholar",
+                "federated_search": "arXiv + Semantic Scholar",
+                "arxiv_sweep": "arXiv (Sweep)",
                 "compare_custom": "Local Database (Comparison)",
                 "compare": "Local Database (Comparison)",
                 "arxiv_vs_local_compare": "arXiv + Local Database (Comparison)",
                 "compare_web_results": f"{st.session_state['last_web_search']['type'].capitalize() if 'last_web_search' in st.session_state else 'Web'} (Comparison)",
                 "compare_arxiv_local": "arXiv + Local Database (Comparison)",
+                "compare_matrix": "Similarity Matrix",
+                "compare_batch": "Batch Comparison",
                 "unknown": "Unknown"
             }
             search_source = source_map.get(intent, "Unknown")
@@ -122,18 +141,23 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
             exclude_words = {'arxiv', 'semantic', 'scholar', 'query', 'search'}
             if intent == "arxiv_search":
                 keywords = ' '.join(w for w in params.split() if w.lower() not in exclude_words)
-            elif intent == "semantic_search":
+            elif intent in ["semantic_search", "federated_search"]:
                 keyword, _, _ = params
                 keywords = ' '.join(w for w in keyword.split() if w.lower() not in exclude_words)
-            elif intent == "local_query":
+            elif intent == "arxiv_sweep":
                 keyword, _ = params
                 keywords = ' '.join(w for w in keyword.split() if w.lower() not in exclude_words)
+            elif intent == "local_query":
+                keywords = ' '.join(w for w in params.split() if w.lower() not in exclude_words)
             elif intent == "arxiv_vs_local_compare":
                 keyword, _ = params
-                keywords = ' '.join(w for w in params.split() if w.lower() not in exclude_words)
+                keywords = ' '.join(w for w in keyword.split() if w.lower() not in exclude_words)
             elif intent == "compare_custom":
                 indices, topic = params
                 keywords = topic if topic else "None"
+            elif intent == "compare_batch":
+                _, _, _, topic = params
+                keywords = topic if topic else "None"
             elif intent == "compare":
                 keywords = params if params else "None"
             elif intent in ["compare_web_results", "compare_arxiv_local"]:
@@ -153,13 +177,12 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                 else:
                     st.warning("No papers found in local database.")
             elif intent == "local_query":
-                keyword, _ = params
                 st.markdown("### 🔍 Local Abstract Query Results:")
-                pdf_files = [f"papers/{f}" for f in os.listdir("papers") if f.endswith(".pdf")]
-                results = vector_store.query(keyword, pdf_files=pdf_files)
+                results = vector_store.query(params, pdf_dir="papers")
                 if results:
                     for i, res in enumerate(results, 1):
-                        st.markdown(f"**{i}. {res['title']}**")
+                        page_note = f" (p. {res['page']})" if res.get('page') else ""
+                        st.markdown(f"**{i}. {res['title']}**{page_note}")
                         st.markdown(f"> {res['text'][:500]}...")
                         if res['source'] == 'pdf' and st.button(f"➕ Import Paper {i} (Local)", key=f"local_import_{i}_{uuid.uuid4()}"):
                             file_hash = PDFProcessor().get_file_hash((res['title'] + res['text']).encode("utf-8"))
@@ -192,10 +215,31 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                             })
                 else:
                     st.warning("No results found on arXiv.")
+            elif intent == "arxiv_sweep":
+                keyword, max_results = params
+                progress = st.empty()
+                results = []
+                try:
+                    # Records arrive page by page; render each as soon as it is parsed.
+                    for record in web_search.iter_arxiv(SearchQuery(keyword), max_results=max_results):
+                        results.append((record["title"], record["abstract"], record["link"]))
+                        authors = ", ".join(record["authors"][:3]) + (" et al." if len(record["authors"]) > 3 else "")
+                        st.markdown(f"**{len(results)}. [{record['title']}]({record['link']})**")
+                        st.caption(f"{authors} | {record['published'][:10]} | {', '.join(record['categories'])}")
+                        progress.markdown(f"Fetched {len(results)} of up to {max_results} papers...")
+                except SearchError as e:
+                    st.error(f"❌ arXiv sweep stopped: {str(e)}")
+                progress.markdown(f"Fetched {len(results)} papers.")
+                session_key = memory_manager.remember_search(results, f"arxiv_results_{uuid.uuid4()}")
+                if session_key:
+                    st.session_state['last_web_search'] = {'type': 'arxiv', 'key': session_key}
+                    st.session_state['last_search_keyword'] = keywords
+                if not results:
+                    st.warning("No results found on arXiv.")
             elif intent == "semantic_search":
                 session_key = f"semantic_results_{uuid.uuid4()}"
                 keyword, max_results, days = params
-                results = web_search.search_semantic_scholar(keyword, max_results=max_results, days=days)
+                results = web_search.search_semantic_scholar(SearchQuery(keyword, max_results=max_results, days=days))
                 session_key = memory_manager.remember_search(results, session_key)
                 if session_key:
                     st.session_state['last_web_search'] = {'type': 'semantic', 'key': session_key}
@@ -220,6 +264,35 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                             })
                 else:
                     st.warning("No results found on Semantic Scholar.")
+            elif intent == "federated_search":
+                keyword, max_results, days = params
+                results, status = web_search.search_federated(SearchQuery(keyword, max_results=max_results, days=days))
+                for source, state in status.items():
+                    if state == "timeout":
+                        st.warning(f"⚠️ {source} did not respond in time; showing partial results.")
+                    elif state != "ok":
+                        st.warning(f"⚠️ {source} search failed: {state}")
+                session_key = memory_manager.remember_search(results, f"federated_results_{uuid.uuid4()}")
+                if session_key:
+                    st.session_state['last_web_search'] = {'type': 'federated', 'key': session_key}
+                    st.session_state['last_search_keyword'] = keywords
+                if results:
+                    for i, paper in enumerate(results, 1):
+                        st.markdown(f"**{i}. [{paper['title']}]({paper['url']})** ({paper['source']})")
+                        st.markdown(f"Authors: {paper['authors']} | Year: {paper['year']} | Venue: {paper['venue']}")
+                        st.markdown(f"> {paper['abstract']}")
+                        if paper['doi']:
+                            st.markdown(f"DOI: {paper['doi']}")
+                        if st.button(f"➕ Import Paper {i} (Federated)", key=f"federated_import_{i}_{uuid.uuid4()}"):
+                            file_hash = PDFProcessor().get_file_hash((paper['title'] + paper['abstract']).encode("utf-8"))
+                            memory_manager.remember_uploaded({
+                                "title": paper['title'],
+                                "abstract": paper['abstract'],
+                                "file_hash": file_hash,
+                                "source": "web_search"
+                            })
+                else:
+                    st.warning("No results found on arXiv or Semantic Scholar.")
             elif intent == "compare_custom":
                 indices, topic = params
                 paper1 = memory_manager.get_paper_by_index(indices[0], "database")
@@ -231,9 +304,7 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     st.markdown(f"> {abs1[:500]}...")
                     st.markdown(f"#### 📙 Paper 2 (Index {indices[1]}): {title2}")
                     st.markdown(f"> {abs2[:500]}...")
-                    result = comparator.compare_abstracts(abs1, abs2, topic)
-                    st.markdown("### 📋 Comparison Result:")
-                    st.markdown(result)
+                    result = render_comparison_stream(comparator, abs1, abs2, topic)
                     pdf_buffer, pdf_filename = generate_comparison_pdf(title1, abs1, title2, abs2, result)
                     st.download_button(
                         label="📥 Export Comparison PDF",
@@ -257,9 +328,7 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                         st.markdown(f"> {abs1[:500]}...")
                         st.markdown(f"#### 📙 Paper 2 (Index 2): {title2}")
                         st.markdown(f"> {abs2[:500]}...")
-                        result = comparator.compare_abstracts(abs1, abs2, topic)
-                        st.markdown("### 📋 Comparison Result:")
-                        st.markdown(result)
+                        result = render_comparison_stream(comparator, abs1, abs2, topic)
                         pdf_buffer, pdf_filename = generate_comparison_pdf(title1, abs1, title2, abs2, result)
                         st.download_button(
                             label="📥 Export Comparison PDF",
@@ -287,9 +356,7 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     st.markdown(f"> {local_abs[:500]}...")
                     st.markdown(f"#### 📙 arXiv Paper: {arxiv_title}")
                     st.markdown(f"> {arxiv_abs[:500]}...")
-                    result = comparator.compare_abstracts(local_abs, arxiv_abs, keyword)
-                    st.markdown("### 📋 Comparison Result:")
-                    st.markdown(result)
+                    result = render_comparison_stream(comparator, local_abs, arxiv_abs, keyword)
                     pdf_buffer, pdf_filename = generate_comparison_pdf(local_title, local_abs, arxiv_title, arxiv_abs, result)
                     st.download_button(
                         label="📥 Export Comparison PDF",
@@ -300,6 +367,75 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     )
                 else:
                     st.warning("No results found on arXiv or local paper does not exist.")
+            elif intent == "compare_matrix":
+                source, limit = params
+                if source == "local":
+                    papers = memory_manager.get_library_papers(limit=limit)
+                elif 'last_web_search' in st.session_state:
+                    papers = memory_manager.get_search_papers(st.session_state['last_web_search']['key'])[:limit]
+                else:
+                    st.error("❌ No recent web search results. Please perform an arXiv or Semantic Scholar search first.")
+                    return
+                if len(papers) < 2:
+                    st.warning("⚠️ At least two papers are needed for a similarity matrix.")
+                    return
+                survey = comparator.compare_many(papers)
+                st.markdown(f"### 🧮 Similarity Survey of {len(papers)} Papers")
+                st.markdown("#### Most Similar Pairs")
+                for i, j, score in survey['pairs']:
+                    st.markdown(f"- **{score:.2f}**: [{i + 1}] {papers[i][0]} ↔ [{j + 1}] {papers[j][0]}")
+                if survey['clusters']:
+                    st.markdown("#### Clusters")
+                    for n, members in enumerate(survey['clusters'], 1):
+                        st.markdown(f"**Cluster {n}** ({len(members)} papers)")
+                        for i in members:
+                            st.markdown(f"- [{i + 1}] {papers[i][0]}")
+                else:
+                    st.info("No clusters of closely related papers found.")
+                with st.expander("Full similarity matrix"):
+                    st.dataframe(survey['matrix'].round(2), use_container_width=True)
+            elif intent == "compare_batch":
+                source, anchor, candidates, topic = params
+                papers = memory_manager.get_papers_by_indices([anchor] + candidates, source)
+                if anchor not in papers:
+                    st.error(f"❌ Paper {anchor} was not found.")
+                    return
+                missing = [i for i in candidates if i not in papers]
+                if missing:
+                    st.warning(f"⚠️ Skipping papers not found: {', '.join(map(str, missing))}")
+                candidates = [i for i in candidates if i in papers]
+                if not candidates:
+                    return
+                anchor_title, anchor_abstract = papers[anchor]
+                st.markdown(f"#### 📘 Paper {anchor}: {anchor_title}")
+                st.markdown(f"> {anchor_abstract[:500]}...")
+                started = time.perf_counter()
+                with st.spinner(f"Comparing against {len(candidates)} papers..."):
+                    results = comparator.compare_pairs([(anchor_abstract, papers[i][1]) for i in candidates], topic)
+                elapsed = time.perf_counter() - started
+                total_tokens = sum((r.usage or {}).get("total_tokens", 0) for r in results)
+                st.caption(
+                    f"{len(results)} comparisons in {elapsed:.1f}s "
+                    f"(sum of per-pair latency {sum(r.latency for r in results):.1f}s, {total_tokens} tokens)"
+                )
+                for i, result in zip(candidates, results):
+                    title, abstract = papers[i]
+                    with st.expander(f"📙 Paper {i}: {title} — similarity {result.similarity:.2f}", expanded=len(results) == 1):
+                        st.markdown(result.text)
+                        tokens = (result.usage or {}).get("total_tokens")
+                        st.caption(
+                            f"Latency {result.latency:.1f}s"
+                            + (f" | {tokens} tokens" if tokens else "")
+                            + (" | cached" if result.cached else "")
+                        )
+                        pdf_buffer, pdf_filename = generate_comparison_pdf(anchor_title, anchor_abstract, title, abstract, result.text)
+                        st.download_button(
+                            label="📥 Export Comparison PDF",
+                            data=pdf_buffer,
+                            file_name=pdf_filename,
+                            mime="application/pdf",
+                            key=f"export_batch_{i}_{uuid.uuid4()}"
+                        )
             elif intent == "compare_web_results":
                 indices, topic = params
                 if 'last_web_search' not in st.session_state:
@@ -313,6 +449,8 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     keyword = st.session_state.get('last_search_keyword', topic or 'general')
                     if search_type == 'arxiv':
                         results = web_search.search_arxiv(keyword)
+                    elif search_type == 'federated':
+                        results, _ = web_search.search_federated(keyword)
                     else:
                         results = web_search.search_semantic_scholar(keyword)
                     session_key = memory_manager.remember_search(results)
@@ -340,9 +478,7 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     if not abs1 or not abs2 or "(No abstract)" in [abs1, abs2]:
                         st.warning("⚠️ One or more papers lack a valid abstract, cannot compare.")
                         return
-                    result = comparator.compare_abstracts(abs1, abs2, topic)
-                    st.markdown("### 📋 Comparison Result:")
-                    st.markdown(result)
+                    result = render_comparison_stream(comparator, abs1, abs2, topic)
                     pdf_buffer, pdf_filename = generate_comparison_pdf(title1, abs1, title2, abs2, result)
                     st.download_button(
                         label="📥 Export Comparison PDF",
@@ -397,9 +533,7 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
                     if not arxiv_abs or not local_abs or "(No abstract)" in [arxiv_abs, local_abs]:
                         st.warning("⚠️ One or more papers lack a valid abstract, cannot compare.")
                         return
-                    result = comparator.compare_abstracts(arxiv_abs, local_abs, topic)
-                    st.markdown("### 📋 Comparison Result:")
-                    st.markdown(result)
+                    result = render_comparison_stream(comparator, arxiv_abs, local_abs, topic)
                     pdf_buffer, pdf_filename = generate_comparison_pdf(arxiv_title, arxiv_abs, local_title, local_abs, result)
                     st.download_button(
                         label="📥 Export Comparison PDF",
@@ -413,36 +547,50 @@ def render_agent_ui(db: Database, nlp: NLPProcessor, web_search: WebSearch, comp
             else:
                 st.error(f"❌ Unknown command: {user_command}. Try: search arxiv for vit, compare arxiv paper 2 with local paper 6")
 
-def render_upload_ui(db: Database, processor: PDFProcessor, memory_manager: MemoryManager):
+def render_upload_ui(ingest: IngestPipeline, memory_manager: MemoryManager):
     st.sidebar.header("📥 Upload PDF")
     uploaded_files = st.sidebar.file_uploader("Choose PDF files to upload:", type="pdf", accept_multiple_files=True)
     if uploaded_files:
-        known_hashes = db.get_known_hashes()
-        for uploaded_file in uploaded_files:
-            file_bytes = uploaded_file.read()
-            file_hash = processor.get_file_hash(file_bytes)
-            if file_hash in known_hashes:
-                st.sidebar.warning(f"⚠️ File already exists: {uploaded_file.name}")
-                continue
-            title, abstract, _ = processor.extract_title_abstract(file_bytes)
-            memory_manager.remember_uploaded({
-                "title": title,
-                "abstract": abstract,
-                "file_hash": file_hash,
-                "source": "web_upload"
-            })
-            with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-                pix = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(2, 2))
-                st.image(pix.tobytes("png"), caption=f"PDF Preview - {uploaded_file.name}", use_column_width=True)
+        items = [IngestItem(uploaded_file.name, data=uploaded_file.read()) for uploaded_file in uploaded_files]
+        progress = st.sidebar.progress(0.0, text=f"Ingesting {len(items)} files...")
+
+        def on_progress(result, done, total):
+            progress.progress(done / total, text=f"{done}/{total}: {result.name}")
+            if result.status == "duplicate":
+                st.sidebar.warning(f"⚠️ File already exists: {result.name}")
+            elif result.status == "failed":
+                st.sidebar.error(f"❌ {result.name}: {result.error}")
+            elif result.preview:
+                st.image(result.preview, caption=f"PDF Preview - {result.name}", use_column_width=True)
+
+        ingest.ingest(
+            items,
+            source="web_upload",
+            preview_zoom=2,
+            commit=memory_manager.remember_uploaded_many,
+            on_progress=on_progress
+        )
         st.rerun()
 
 def render_download_ui(db: Database):
     st.sidebar.header("📤 Download Abstract PDF")
-    papers = db.get_papers()
-    options = {f"[{pid}] {title[:40]}...": (pid, title, abstract) for pid, title, abstract in papers}
+    # Keyset cursors of the pages visited so far; only the current page is fetched per rerun.
+    cursors = st.session_state.setdefault("download_page_cursors", [None])
+    rows, next_cursor = db.list_papers(
+        columns=("id", "title"), limit=DOWNLOAD_PAGE_SIZE, after=cursors[-1], newest_first=True
+    )
+    options = {f"[{pid}] {title[:40]}...": pid for pid, title in rows}
     selected = st.sidebar.selectbox("Select abstract to download:", list(options.keys()))
-    if st.sidebar.button("📄 Download Abstract PDF"):
-        pid, title, abstract = options[selected]
+    prev_col, next_col = st.sidebar.columns(2)
+    if prev_col.button("⬅️ Newer", disabled=len(cursors) == 1, key="download_page_prev"):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Older ➡️", disabled=next_cursor is None, key="download_page_next"):
+        cursors.append(next_cursor)
+        st.rerun()
+    if selected and st.sidebar.button("📄 Download Abstract PDF"):
+        pid = options[selected]
+        title, abstract = db.get_paper_by_id(pid)
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=letter)
         width, height = letter
@@ -477,4 +625,54 @@ def render_download_ui(db: Database):
             data=buffer,
             file_name=f"abstract_{pid}.pdf",
             mime="application/pdf"
-        )
\ No newline at end of file
+        )
+
+def render_startup_report(registry):
+    st.sidebar.header("⏱️ Component Startup")
+    build_times = registry.build_times()
+    if not build_times:
+        st.sidebar.caption("No components built yet.")
+        return
+    with st.sidebar.expander(f"Total: {sum(build_times.values()):.2f} s"):
+        for name, seconds in sorted(build_times.items(), key=lambda x: x[1], reverse=True):
+            st.markdown(f"- `{name}`: {seconds * 1000:.0f} ms")
+    if "db" in build_times:
+        stats = registry.get("db").pool_stats()
+        with st.sidebar.expander(f"Database pool: {stats['in_use']}/{stats['max_connections']} in use"):
+            st.markdown(f"- Checkouts: {stats['checkouts']}")
+            st.markdown(f"- Wait avg / p95 / max: {stats['avg_wait'] * 1000:.1f} / {stats['p95_wait'] * 1000:.1f} / {stats['max_wait'] * 1000:.1f} ms")
+            st.markdown(f"- Timeouts: {stats['timeouts']}, reconnects: {stats['reconnects']}")
+    if "embeddings" in build_times:
+        cache = registry.get("embeddings").cache_stats()
+        memory, disk = cache["memory"], cache["disk"]
+        with st.sidebar.expander(f"Embedding cache: {memory['hit_rate']:.0%} memory hits"):
+            st.markdown(f"- Memory: {memory['hits']} hits / {memory['misses']} misses")
+            if disk:
+                st.markdown(f"- Disk: {disk['hits']} hits / {disk['misses']} misses ({disk['hit_rate']:.0%}), {disk['entries']} entries, {disk['evictions']} evicted")
+    if "llm_cache" in build_times:
+        llm_cache = registry.get("llm_cache")
+        stats = llm_cache.stats()
+        with st.sidebar.expander(f"LLM response cache: {stats['hit_rate']:.0%} hits"):
+            for site, site_stats in sorted(llm_cache.site_stats().items()):
+                st.markdown(f"- `{site}`: {site_stats['hits']} hits / {site_stats['misses']} misses")
+            st.markdown(f"- Entries: {stats['entries']}, evicted: {stats['evictions']}")
+    if "abstract_validator" in build_times:
+        stats = registry.get("abstract_validator").stats()
+        with st.sidebar.expander(f"Abstract checks: {stats['local_rate']:.0%} decided locally"):
+            st.markdown(f"- Accepted / rejected locally: {stats['accepted_local']} / {stats['rejected_local']}")
+            st.markdown(f"- Escalated to LLM: {stats['llm']}, heuristic fallback: {stats['fallback']}")
+    if "http" in build_times and registry.get("http").cache is not None:
+        stats = registry.get("http").cache.stats()
+        with st.sidebar.expander(f"Web search cache: {stats['hit_rate']:.0%} hits"):
+            st.markdown(f"- {stats['hits']} hits / {stats['misses']} misses, {stats['entries']} entries")
+    endpoints = endpoint_states()
+    if endpoints:
+        unhealthy = [e for e in endpoints if e['state'] != "closed"]
+        with st.sidebar.expander(f"External services: {len(unhealthy)} degraded" if unhealthy else "External services: all healthy"):
+            for endpoint in endpoints:
+                icon = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}[endpoint['state']]
+                note = f", paused {endpoint['blocked_for']:.0f}s (Retry-After)" if endpoint['blocked_for'] else ""
+                st.markdown(
+                    f"- {icon} `{endpoint['name']}`: {endpoint['state']}, "
+                    f"{endpoint['failures']} failures / {endpoint['successes']} ok, {endpoint['rejected']} rejected{note}"
+                )
@@ -1,19 +1,42 @@
 import chromadb
-from chromadb.utils import embedding_functions
 import numpy as np
 import os
-import streamlit as st
-from .database import Database
+import json
+import logging
+from . import notify
+from .database import Database, NO_ABSTRACT
+from .embeddings import EmbeddingService
+from .manifest import PDFManifest, file_content_hash, file_lock
+from .pdf_parsing import ParsedPDF
 import hashlib
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHROMA_PATH = "./chroma_db"
+# Bump when database vector metadata changes so existing installs re-check every row once.
+SYNC_STATE_VERSION = 2
 
 class VectorStore:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, embedding_service: EmbeddingService = None, sync_batch_size=256,
+                 chunk_words=180, chunk_overlap=40, embed_batch_size=128, chunk_oversample=8, aggregate_k=3):
         self.db = db
+        self.embeddings = embedding_service or EmbeddingService()
+        self.sync_batch_size = sync_batch_size
+        # all-MiniLM-L6-v2 truncates at 256 word pieces; ~180 words stays under that.
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = embed_batch_size
+        self.chunk_oversample = chunk_oversample
+        self.aggregate_k = aggregate_k
+        self.sync_state_path = os.path.join(CHROMA_PATH, "db_sync_state.json")
+        self.manifest = PDFManifest(os.path.join(CHROMA_PATH, "pdf_manifest.json"))
+        self._pdf_lock = threading.Lock()
+        self._db_sync_lock = threading.Lock()
         # Initialize ChromaDB client with persistent storage
-        self.chroma_client = chromadb.PersistentClient(path="./chroma_db")
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+        self.chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+        self.embedding_function = self.embeddings.as_chroma_function()
         # Create or get collection
         self.collection = self.chroma_client.get_or_create_collection(
             name="papers",
@@ -22,90 +45,382 @@ class VectorStore:
         # Index existing database papers
         self.index_database_papers()
 
-    def index_database_papers(self):
-        """Index all papers in the database into ChromaDB."""
-        papers = self.db.get_papers()
-        if not papers:
-            return
-        documents = []
-        metadatas = []
-        ids = []
-        for idx, (paper_id, title, abstract) in enumerate(papers, 1):
-            if abstract and abstract != "(No valid abstract found.)":
-                text = f"{title}\n{abstract}"
+    def _load_sync_state(self):
+        try:
+            with open(self.sync_state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("version") == SYNC_STATE_VERSION else None
+
+    def _save_sync_state(self, state):
+        tmp_path = self.sync_state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.sync_state_path)
+
+    @staticmethod
+    def _paper_document(title, abstract, file_hash=None):
+        """Return the embedded text and the digest Database.get_paper_digests computes for the row."""
+        text = f"{title}\n{abstract}"
+        digest = f"{text}\n{file_hash or ''}"
+        return text, hashlib.md5(digest.encode("utf-8")).hexdigest()
+
+    def _upsert_database_rows(self, rows):
+        """Embed and upsert (id, title, abstract, file_hash) rows in batches; returns the number indexed."""
+        indexed = 0
+        for start in range(0, len(rows), self.sync_batch_size):
+            documents, metadatas, ids = [], [], []
+            for paper_id, title, abstract, file_hash in rows[start:start + self.sync_batch_size]:
+                if not abstract or abstract == NO_ABSTRACT:
+                    continue
+                text, content_hash = self._paper_document(title, abstract, file_hash)
+                metadata = {"paper_id": paper_id, "title": title, "source": "database", "content_hash": content_hash}
+                if file_hash:
+                    # Lets semantic_search merge this row with the PDF passages of the same file.
+                    metadata["file_hash"] = file_hash
                 documents.append(text)
-                metadatas.append({"paper_id": paper_id, "title": title, "source": "database"})
+                metadatas.append(metadata)
                 ids.append(str(paper_id))
-        if documents:
-            try:
-                self.collection.upsert(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                st.info("✅ 已索引資料庫中的論文嵌入")
-            except Exception as e:
-                st.warning(f"⚠️ 索引資料庫論文失敗：{str(e)}")
+            if documents:
+                self.collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+                indexed += len(documents)
+        return indexed
 
-    def index_pdf_file(self, file_path):
-        """Index a single PDF file into ChromaDB."""
-        if not os.path.exists(file_path):
-            st.warning(f"⚠️ 檔案 {file_path} 不存在")
-            return
+    def _indexed_database_hashes(self):
+        indexed = self.collection.get(where={"source": "database"}, include=["metadatas"])
+        return {
+            int(metadata["paper_id"]): metadata.get("content_hash")
+            for metadata in indexed["metadatas"]
+        }
+
+    def remove_database_papers(self, paper_ids):
+        """Drop vectors for papers removed with Database.delete_papers."""
+        if paper_ids:
+            self.collection.delete(ids=[str(pid) for pid in paper_ids])
+
+    def sync_database_papers(self, full=False):
+        """
+        Bring the Chroma index in line with the papers table, embedding only what changed.
+
+        A high-water mark (last indexed id, row count, latest created_at) is kept next to
+        the Chroma store. When only new rows were appended, just those rows are fetched and
+        embedded. When rows disappeared, the state file is missing, or ``full`` is set, the
+        per-row content hashes from Postgres are compared with those stored in Chroma, and
+        only new or changed rows are re-embedded; vectors for deleted rows are removed.
+
+        Sessions and the bulk-ingest CLI may sync at once, so the whole load, diff and save
+        runs under an in-process lock and a file lock; a waiting caller then sees the
+        state its predecessor saved and usually has nothing left to do.
+
+        Returns:
+            tuple: (number of papers embedded, number of vectors removed).
+        """
+        with self._db_sync_lock, file_lock(self.sync_state_path + ".lock"):
+            return self._sync_database_papers(full)
+
+    def _sync_database_papers(self, full):
+        max_id, count, max_created_at = self.db.get_paper_watermark()
+        state = None if full else self._load_sync_state()
+        if state and state["last_id"] == max_id and state["count"] == count:
+            return 0, 0
+
+        embedded, removed = 0, 0
+        new_rows = self.db.get_papers_after(state["last_id"]) if state else []
+        if state and state["count"] + len(new_rows) == count:
+            # Append-only change: nothing below the high-water mark moved.
+            embedded = self._upsert_database_rows([row[:4] for row in new_rows])
+        else:
+            digests = dict(self.db.get_paper_digests())
+            indexed = self._indexed_database_hashes()
+            changed = [pid for pid, digest in digests.items() if indexed.get(pid) != digest]
+            stale = [pid for pid in indexed if pid not in digests]
+            for start in range(0, len(changed), self.sync_batch_size):
+                rows = self.db.get_papers_by_ids(changed[start:start + self.sync_batch_size])
+                embedded += self._upsert_database_rows(rows)
+            self.remove_database_papers(stale)
+            removed = len(stale)
+
+        self._save_sync_state({
+            "version": SYNC_STATE_VERSION,
+            "last_id": max_id,
+            "count": count,
+            "last_created_at": max_created_at.isoformat() if max_created_at else None
+        })
+        logger.info(f"Database sync: {embedded} embedded, {removed} removed")
+        return embedded, removed
+
+    def index_database_papers(self):
+        """Incrementally index database papers into ChromaDB."""
         try:
-            import fitz
-            with fitz.open(file_path) as doc:
-                text = "\n".join([page.get_text() for page in doc])
-            if not text.strip():
-                st.warning(f"⚠️ 檔案 {file_path} 無有效文本，無法生成嵌入")
-                return
-            file_hash = hashlib.md5(text.encode()).hexdigest()
+            embedded, removed = self.sync_database_papers()
+            if embedded or removed:
+                notify.info(f"✅ 已同步資料庫論文嵌入（新增/更新 {embedded} 篇，移除 {removed} 篇）")
+        except Exception as e:
+            notify.warning(f"⚠️ 索引資料庫論文失敗：{str(e)}")
+
+    def chunk_pages(self, pages):
+        """
+        Split page texts into overlapping word windows sized for MiniLM's input limit.
+
+        Args:
+            pages (list[str]): Text of each page, in order.
+
+        Returns:
+            list: (page number, passage) tuples; page numbers are 1-based and refer to
+            the page where the passage starts.
+        """
+        words = []
+        for page_no, text in enumerate(pages, 1):
+            words.extend((page_no, word) for word in text.split())
+        step = max(1, self.chunk_words - self.chunk_overlap)
+        chunks = []
+        for start in range(0, len(words), step):
+            window = words[start:start + self.chunk_words]
+            chunks.append((window[0][0], " ".join(word for _, word in window)))
+            if start + self.chunk_words >= len(words):
+                break
+        return chunks
+
+    def index_pdf_file(self, file_path, content_hash=None, parsed: ParsedPDF = None):
+        """
+        Index a PDF into ChromaDB as overlapping passages keyed by the hash of its bytes.
+
+        Pass the ``ParsedPDF`` already used for metadata extraction as ``parsed`` so pages
+        read then are not extracted again.
+        """
+        if parsed is None and not os.path.exists(file_path):
+            notify.warning(f"⚠️ 檔案 {file_path} 不存在")
+            return False
+        try:
+            if parsed is None:
+                with ParsedPDF(path=file_path) as own:
+                    pages = own.pages
+            else:
+                pages = parsed.pages
+            chunks = self.chunk_pages(pages)
+            if not chunks:
+                notify.warning(f"⚠️ 檔案 {file_path} 無有效文本，無法生成嵌入")
+                return False
+            file_hash = content_hash or file_content_hash(file_path)
             try:
-                self.collection.upsert(
-                    documents=[text],
-                    metadatas=[{"file_path": file_path, "source": "pdf", "file_hash": file_hash}],
-                    ids=[file_hash]
-                )
-                st.success(f"✅ 已索引 PDF 檔案：{file_path}")
+                self._drop_pdf_vectors(file_hash)
+                for start in range(0, len(chunks), self.embed_batch_size):
+                    batch = chunks[start:start + self.embed_batch_size]
+                    passages = [passage for _, passage in batch]
+                    self.collection.upsert(
+                        documents=passages,
+                        embeddings=self.embeddings.encode_many(passages).tolist(),
+                        metadatas=[
+                            {"file_path": file_path, "source": "pdf", "file_hash": file_hash, "chunk": start + i, "page": page_no}
+                            for i, (page_no, _) in enumerate(batch)
+                        ],
+                        ids=[f"{file_hash}:{start + i}" for i in range(len(batch))]
+                    )
+                notify.success(f"✅ 已索引 PDF 檔案：{file_path}（{len(chunks)} 段）")
+                return True
             except Exception as e:
-                st.warning(f"⚠️ 無法生成檔案 {file_path} 的嵌入：{str(e)}")
+                notify.warning(f"⚠️ 無法生成檔案 {file_path} 的嵌入：{str(e)}")
         except Exception as e:
-            st.warning(f"⚠️ 無法處理檔案 {file_path}：{str(e)}")
+            notify.warning(f"⚠️ 無法處理檔案 {file_path}：{str(e)}")
+        return False
+
+    def _relink_pdf_vectors(self, file_hash, file_path):
+        """
+        Reuse existing vectors for ``file_hash`` for a renamed or copied file.
+
+        The vectors are pointed at ``file_path`` only when the file they cite no longer
+        holds that content (a rename); a copy leaves them citing the original.
+        """
+        existing = self.collection.get(where=self._pdf_where(file_hash), include=["metadatas"])
+        if not existing["ids"]:
+            return False
+        current = existing["metadatas"][0].get("file_path")
+        if current and self._holds_content(current, file_hash):
+            return True
+        metadatas = [dict(metadata, file_path=file_path) for metadata in existing["metadatas"]]
+        self.collection.update(ids=existing["ids"], metadatas=metadatas)
+        return True
+
+    def _holds_content(self, file_path, file_hash):
+        entry = self.manifest.get(file_path)
+        return bool(entry) and entry["content_hash"] == file_hash and os.path.exists(file_path)
+
+    def _rehome_pdf_vectors(self, file_hash, gone_path):
+        """Point vectors for ``file_hash`` that cite ``gone_path`` at a surviving copy."""
+        survivor = next(
+            (path for path in self.manifest.paths_with_hash(file_hash) if self._holds_content(path, file_hash)), None
+        )
+        if survivor is None:
+            return
+        existing = self.collection.get(where=self._pdf_where(file_hash), include=["metadatas"])
+        gone = os.path.normpath(gone_path)
+        stale = [
+            (vector_id, metadata) for vector_id, metadata in zip(existing["ids"], existing["metadatas"])
+            if os.path.normpath(metadata.get("file_path", "")) == gone
+        ]
+        if stale:
+            self.collection.update(
+                ids=[vector_id for vector_id, _ in stale],
+                metadatas=[dict(metadata, file_path=survivor) for _, metadata in stale]
+            )
+
+    def _drop_pdf_vectors(self, file_hash):
+        self.collection.delete(where=self._pdf_where(file_hash))
+
+    @staticmethod
+    def _pdf_where(file_hash):
+        # Database vectors carry file_hash too; only PDF passages belong to the manifest.
+        return {"$and": [{"source": "pdf"}, {"file_hash": file_hash}]}
+
+    def sync_pdf_files(self, pdf_files, prune_under=None, parsed=None):
+        """
+        Index only new or modified PDFs, using the manifest to skip unchanged files.
+
+        Files whose size and mtime match the manifest are skipped without being opened.
+        A file whose bytes hash to an already-indexed document (a rename, copy or touch) is
+        not re-embedded; vectors are repointed only when the file they cite is gone. Manifest entries under ``prune_under`` that no longer exist
+        on disk are removed along with their vectors, unless another file shares the hash.
+        ``parsed`` maps paths to ``(content_hash, ParsedPDF)`` already produced by ingestion,
+        so those files are neither hashed nor parsed again.
 
-    def semantic_search(self, query, top_k=5):
-        """Perform semantic search across database and PDF files."""
+        Returns:
+            tuple: (files indexed, files pruned).
+        """
+        with self._pdf_lock, self.manifest.locked():
+            # Another process (e.g. script/bulk_ingest.py) may have written the manifest since.
+            self.manifest.reload()
+            if not self.manifest.exists:
+                # Vectors indexed before the manifest existed used text-hash ids; start clean.
+                self.collection.delete(where={"source": "pdf"})
+            indexed, pruned = 0, 0
+            present = set()
+            for file_path in pdf_files:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                present.add(os.path.normpath(file_path))
+                if self.manifest.is_unchanged(file_path, stat):
+                    continue
+                prepared = (parsed or {}).get(file_path)
+                content_hash = prepared[0] if prepared else file_content_hash(file_path)
+                previous = self.manifest.get(file_path)
+                if content_hash in self.manifest.hashes_in_use() and self._relink_pdf_vectors(content_hash, file_path):
+                    self.manifest.record(file_path, stat, content_hash)
+                elif self.index_pdf_file(file_path, content_hash=content_hash, parsed=prepared[1] if prepared else None):
+                    self.manifest.record(file_path, stat, content_hash)
+                    indexed += 1
+                else:
+                    continue
+                if previous and previous["content_hash"] != content_hash:
+                    if previous["content_hash"] not in self.manifest.hashes_in_use():
+                        self._drop_pdf_vectors(previous["content_hash"])
+                    else:
+                        self._rehome_pdf_vectors(previous["content_hash"], file_path)
+            if prune_under is not None:
+                root = os.path.normpath(prune_under)
+                for path in self.manifest.paths():
+                    if path in present or os.path.dirname(path) != root:
+                        continue
+                    entry = self.manifest.remove(path)
+                    pruned += 1
+                    if entry["content_hash"] not in self.manifest.hashes_in_use():
+                        self._drop_pdf_vectors(entry["content_hash"])
+                    else:
+                        # A copy survives; stop citing the deleted path.
+                        self._rehome_pdf_vectors(entry["content_hash"], path)
+            self.manifest.save()
+            return indexed, pruned
+
+    def is_pdf_indexed(self, file_path):
+        with self._pdf_lock:
+            return self.manifest.get(file_path) is not None
+
+    def sync_pdf_directory(self, directory):
+        """Incrementally index every PDF in ``directory`` and prune files that were removed."""
+        if not os.path.isdir(directory):
+            return 0, 0
+        pdf_files = [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".pdf")]
+        return self.sync_pdf_files(pdf_files, prune_under=directory)
+
+    def semantic_search(self, query, top_k=5, aggregate="max"):
+        """
+        Perform semantic search across database and PDF files.
+
+        PDF passages are grouped back into one result per file, together with the database
+        row ingested from the same file, so a paper is listed once. With ``aggregate="max"``
+        a document scores as its best passage; with ``"sum_topk"`` the scores of its top
+        ``self.aggregate_k`` passages are summed, favouring papers that match repeatedly.
+        """
         try:
+            n_results = min(top_k * self.chunk_oversample, self.collection.count())
+            if n_results <= 0:
+                return []
             results = self.collection.query(
                 query_texts=[query],
-                n_results=top_k
+                n_results=n_results
             )
+            grouped = {}
+            for doc, metadata, distance in zip(results['documents'][0], results['metadatas'][0], results['distances'][0]):
+                if metadata.get('file_hash'):
+                    key = ("file", metadata['file_hash'])
+                elif metadata.get('source') == 'database':
+                    key = ("database", metadata['paper_id'])
+                else:
+                    key = ("pdf", metadata['file_path'])
+                # Chroma returns hits best-first, so the first hit per key is its best passage.
+                entry = grouped.setdefault(key, {"doc": doc, "metadata": metadata, "scores": []})
+                entry["scores"].append(1 - distance)  # Convert distance to similarity
+            for entry in grouped.values():
+                if aggregate == "sum_topk":
+                    entry["score"] = sum(sorted(entry["scores"], reverse=True)[:self.aggregate_k])
+                else:
+                    entry["score"] = max(entry["scores"])
+            ranked = sorted(grouped.values(), key=lambda e: e["score"], reverse=True)[:top_k]
+
+            # Hydrate every database hit with one bulk lookup instead of a query per row.
+            paper_rows = self.db.get_paper_map([
+                entry["metadata"]['paper_id'] for entry in ranked if entry["metadata"].get('source') == 'database'
+            ])
             formatted_results = []
-            for idx, (doc, metadata, score) in enumerate(zip(results['documents'][0], results['metadatas'][0], results['distances'][0])):
+            for entry in ranked:
+                doc, metadata = entry["doc"], entry["metadata"]
                 if metadata.get('source') == 'database':
-                    title, abstract = self.db.get_paper_by_id(metadata['paper_id'])
+                    row = paper_rows.get(metadata['paper_id'])
+                    if row is None:
+                        continue  # Deleted since indexing; the next sync drops the vector.
+                    title, abstract = row
                     formatted_results.append({
                         "title": title,
                         "text": abstract,
                         "paper_id": metadata['paper_id'],
                         "source": "database",
-                        "score": 1 - score  # Convert distance to similarity
+                        "score": entry["score"]
                     })
                 else:
                     formatted_results.append({
                         "title": os.path.basename(metadata['file_path']).replace(".pdf", ""),
-                        "text": doc[:500] + "...",
+                        "text": doc,
                         "file_path": metadata['file_path'],
+                        "page": metadata.get('page'),
                         "source": "pdf",
-                        "score": 1 - score
+                        "score": entry["score"]
                     })
             return formatted_results
         except Exception as e:
-            st.warning(f"⚠️ 語義搜索失敗：{str(e)}")
+            notify.warning(f"⚠️ 語義搜索失敗：{str(e)}")
             return []
 
-    def query(self, query, pdf_files=None):
+    def query(self, query, pdf_dir=None, pdf_files=None):
         """Query both database and PDF files."""
-        if pdf_files:
-            for file_path in pdf_files:
-                self.index_pdf_file(file_path)
+        # Cheap watermark check; only papers added since the last sync are embedded.
+        self.index_database_papers()
+        try:
+            if pdf_dir:
+                self.sync_pdf_directory(pdf_dir)
+            elif pdf_files:
+                self.sync_pdf_files(pdf_files)
+        except Exception as e:
+            notify.warning(f"⚠️ PDF 索引同步失敗：{str(e)}")
         return self.semantic_search(query, top_k=5)
\ No newline at end of file
@@ -1,60 +1,165 @@
 import requests
+import urllib3
 import xml.etree.ElementTree as ET
-from .nlp import NLPProcessor
+from urllib.parse import urlsplit
+import io
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+import re
+from typing import Optional
 import datetime
 import logging
 import time
 import os
 from dotenv import load_dotenv
 import streamlit as st
+from .http_client import HttpClient
+from .resilience import CircuitOpenError, RateLimitTimeout, get_endpoint
 import tenacity
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass
+class SearchQuery:
+    """A search already parsed from the user's command; no further keyword extraction is done."""
+    keywords: str
+    max_results: int = 5
+    days: Optional[int] = None
+    require_abstract: bool = True
+
+    @classmethod
+    def coerce(cls, query, **overrides):
+        """Accept a SearchQuery or a plain keyword string (treated as already extracted)."""
+        if isinstance(query, cls):
+            return query
+        return cls(keywords=query, **{k: v for k, v in overrides.items() if v is not None})
+
+class SearchError(Exception):
+    """Raised by the raw fetchers when a source fails; the public search methods report it."""
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ARXIV_ID_PATTERN = re.compile(r"arxiv\.org/abs/(\S+?)(?:v\d+)?$", re.IGNORECASE)
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+
+def _clean(text):
+    return " ".join((text or "").split())
+
+def parse_arxiv_entry(entry):
+    """Turn an Atom <entry> element from the arXiv API into a plain record."""
+    link = _clean(entry.findtext(f"{ATOM}id"))
+    pdf_url = ""
+    for link_elem in entry.findall(f"{ATOM}link"):
+        if link_elem.get("title") == "pdf" or link_elem.get("type") == "application/pdf":
+            pdf_url = link_elem.get("href", "")
+    primary = entry.find(f"{ARXIV_NS}primary_category")
+    return {
+        "arxiv_id": arxiv_id_from_link(link),
+        "title": _clean(entry.findtext(f"{ATOM}title")),
+        "abstract": _clean(entry.findtext(f"{ATOM}summary")),
+        "authors": [_clean(author.findtext(f"{ATOM}name")) for author in entry.findall(f"{ATOM}author")],
+        "categories": [category.get("term") for category in entry.findall(f"{ATOM}category")],
+        "primary_category": primary.get("term") if primary is not None else "",
+        "published": _clean(entry.findtext(f"{ATOM}published")),
+        "updated": _clean(entry.findtext(f"{ATOM}updated")),
+        "doi": _clean(entry.findtext(f"{ARXIV_NS}doi")),
+        "link": link,
+        "pdf_url": pdf_url,
+    }
+
+def iter_arxiv_entries(source):
+    """Incrementally parse an arXiv Atom feed from a file-like object, yielding one record per entry."""
+    root = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == f"{ATOM}entry":
+            yield parse_arxiv_entry(elem)
+            # Drop the finished entry so memory does not grow with the feed.
+            root.remove(elem)
+
+def normalize_title(title):
+    return re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).strip()
+
+def arxiv_id_from_link(link):
+    match = ARXIV_ID_PATTERN.search(link or "")
+    return match.group(1) if match else ""
+
 class WebSearch:
-    def __init__(self):
-        self.nlp = NLPProcessor()
+    def __init__(self, http: HttpClient = None, max_workers=4):
+        self.http = http or HttpClient()
         self.base_url = "https://api.semanticscholar.org/graph/v1"
         load_dotenv()
         self.api_key = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
         self.headers = {"x-api-key": self.api_key} if self.api_key else {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web-search")
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=2, max=10), stop=tenacity.stop_after_attempt(3))
-    def search_arxiv(self, user_input, max_results=5):
-        url = f"http://export.arxiv.org/api/query?search_query=all:{user_input}&start=0&max_results={max_results}"
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.http.close()
+
+    def _fetch_arxiv(self, query, max_results=None):
+        """Fetch one (cached) page of arXiv results as parsed records."""
+        params = {"search_query": f"all:{query.keywords}", "start": 0, "max_results": max_results or query.max_results}
         try:
-            response = requests.get(url, timeout=10)
+            response = self.http.get(ARXIV_API_URL, params=params, timeout=10)
             response.raise_for_status()
-            root = ET.fromstring(response.content)
-            ns = {'atom': 'http://www.w3.org/2005/Atom'}
-            papers = []
-            for entry in root.findall('atom:entry', ns):
-                title = entry.find('atom:title', ns).text.strip().replace('\n', ' ')
-                abstract = entry.find('atom:summary', ns).text.strip().replace('\n', ' ')
-                link = entry.find('atom:id', ns).text.strip()
-                papers.append((title, abstract, link))
-            return papers
-        except requests.RequestException as e:
-            logger.error(f"arXiv search failed: {e}")
-            st.error(f"❌ arXiv 搜尋失敗：{str(e)}")
-            return []
+        except (requests.RequestException, CircuitOpenError, RateLimitTimeout) as e:
+            raise SearchError(str(e)) from e
+        return list(iter_arxiv_entries(io.BytesIO(response.content)))
 
-    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=2, max=10), stop=tenacity.stop_after_attempt(3))
-    def search_semantic_scholar(self, user_input, max_results=5, days=None, require_abstract=True):
+    def iter_arxiv(self, query, max_results=1000, page_size=100):
         """
-        Search Semantic Scholar for papers matching the user input using the Semantic Scholar API.
+        Stream arXiv results for a topic sweep, one parsed record at a time.
 
-        Args:
-            user_input (str): User query (processed by NLP for keywords).
-            max_results (int): Maximum number of papers to return.
-            days (int, optional): Filter papers published in the last N days.
-            require_abstract (bool): If True, only return papers with abstracts.
+        Pages of ``page_size`` are requested at increasing ``start`` offsets and parsed
+        incrementally with iterparse, so memory stays bounded by a single entry and the
+        first records are available before the page finishes downloading. Page requests
+        go through the arXiv rate limiter, which spaces them by arXiv's 3-second delay.
 
-        Returns:
-            list: List of dictionaries containing paper metadata.
+        Yields:
+            dict: Record with arxiv_id, title, abstract, authors, categories, published,
+            updated, link and pdf_url.
         """
-        keyword = self.nlp.extract_arxiv_keywords(user_input)
+        query = SearchQuery.coerce(query)
+        start = 0
+        while start < max_results:
+            count = min(page_size, max_results - start)
+            params = {"search_query": f"all:{query.keywords}", "start": start, "max_results": count}
+            received = 0
+            try:
+                with self.http.stream(ARXIV_API_URL, params=params, timeout=30) as response:
+                    response.raise_for_status()
+                    for record in iter_arxiv_entries(response.raw):
+                        received += 1
+                        yield record
+            except (requests.RequestException, CircuitOpenError, RateLimitTimeout) as e:
+                raise SearchError(str(e)) from e
+            except (urllib3.exceptions.HTTPError, ET.ParseError) as e:
+                # Reads from response.raw fail with urllib3 errors (requests does not wrap
+                # them) and a cut-off feed with ParseError; both mean arXiv failed mid-page.
+                get_endpoint(urlsplit(ARXIV_API_URL).netloc.lower()).record_failure()
+                raise SearchError(f"arXiv stream interrupted after {start + received} results: {str(e)}") from e
+            if received < count:
+                return  # Last page reached.
+            start += received
+
+    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=2, max=10), stop=tenacity.stop_after_attempt(3))
+    def search_arxiv(self, query, max_results=None):
+        query = SearchQuery.coerce(query, max_results=max_results)
+        try:
+            return [(r["title"], r["abstract"], r["link"]) for r in self._fetch_arxiv(query)]
+        except SearchError as e:
+            logger.error(f"arXiv search failed: {e}")
+            st.error(f"❌ arXiv 搜尋失敗：{str(e)}")
+            return []
+
+    def _fetch_semantic_scholar(self, query):
+        keyword, max_results, days, require_abstract = query.keywords, query.max_results, query.days, query.require_abstract
         logger.info(f"Searching Semantic Scholar with keyword: {keyword}")
 
         # Date filter
@@ -67,7 +172,7 @@ class WebSearch:
         fields = [
             "title", "abstract", "url", "year", "authors",
             "venue", "publicationDate", "citationCount",
-            "influentialCitationCount", "openAccessPdf"
+            "influentialCitationCount", "openAccessPdf", "externalIds"
         ]
         params = {
             "query": keyword,
@@ -75,55 +180,174 @@ class WebSearch:
             "fields": ",".join(fields)
         }
 
-        papers = []
         try:
-            response = requests.get(endpoint, params=params, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                results = response.json().get("data", [])
-                for paper_data in results:
-                    abstract = paper_data.get("abstract", "(No abstract)").strip()
-                    if require_abstract and (not abstract or abstract == "(No abstract)"):
+            response = self.http.get(endpoint, params=params, headers=self.headers, timeout=10)
+        except (requests.RequestException, CircuitOpenError, RateLimitTimeout) as e:
+            raise SearchError(str(e)) from e
+        if response.status_code != 200:
+            raise SearchError(f"{response.status_code} - {response.text}")
+
+        papers = []
+        for paper_data in response.json().get("data", []):
+            abstract = (paper_data.get("abstract") or "(No abstract)").strip()
+            if require_abstract and (not abstract or abstract == "(No abstract)"):
+                continue
+
+            # Date filtering
+            if date_filter and "publicationDate" in paper_data and paper_data["publicationDate"]:
+                try:
+                    pub_date = datetime.datetime.strptime(paper_data["publicationDate"], "%Y-%m-%d")
+                    if pub_date < date_filter:
                         continue
+                except (ValueError, TypeError):
+                    pass  # Include if date parsing fails
 
-                    # Date filtering
-                    if date_filter and "publicationDate" in paper_data and paper_data["publicationDate"]:
-                        try:
-                            pub_date = datetime.datetime.strptime(paper_data["publicationDate"], "%Y-%m-%d")
-                            if pub_date < date_filter:
-                                continue
-                        except (ValueError, TypeError):
-                            pass  # Include if date parsing fails
-
-                    # Format authors
-                    authors = ", ".join([author["name"] for author in paper_data.get("authors", [])]) or "Unknown"
-                    
-                    # Handle URL and PDF
-                    url = paper_data.get("url", "") or f"https://www.semanticscholar.org/paper/{paper_data.get('paperId', '')}"
-                    pdf_url = paper_data.get("openAccessPdf", {}).get("url", "") if paper_data.get("openAccessPdf") else ""
-
-                    papers.append({
-                        "title": paper_data.get("title", "Untitled").strip(),
-                        "abstract": abstract,
-                        "authors": authors,
-                        "year": str(paper_data.get("year", "Unknown")),
-                        "doi": paper_data.get("doi", ""),
-                        "url": url,
-                        "venue": paper_data.get("venue", "Unknown"),
-                        "citation_count": paper_data.get("citationCount", 0),
-                        "influential_citation_count": paper_data.get("influentialCitationCount", 0),
-                        "pdf_url": pdf_url,
-                        "source": "Semantic Scholar"
-                    })
-
-                # Trim to max_results after filtering
-                papers = papers[:max_results]
-                logger.info(f"Found {len(papers)} papers for query: {keyword}")
-                return papers
-            else:
-                logger.error(f"Semantic Scholar API error: {response.status_code} - {response.text}")
-                st.error(f"❌ Semantic Scholar 搜尋失敗：{response.text}")
-                return []
-        except requests.RequestException as e:
+            # Format authors
+            authors = ", ".join([author["name"] for author in paper_data.get("authors", [])]) or "Unknown"
+
+            # Handle URL and PDF
+            url = paper_data.get("url", "") or f"https://www.semanticscholar.org/paper/{paper_data.get('paperId', '')}"
+            pdf_url = paper_data.get("openAccessPdf", {}).get("url", "") if paper_data.get("openAccessPdf") else ""
+            external_ids = paper_data.get("externalIds") or {}
+
+            papers.append({
+                "title": (paper_data.get("title") or "Untitled").strip(),
+                "abstract": abstract,
+                "authors": authors,
+                "year": str(paper_data.get("year", "Unknown")),
+                "doi": external_ids.get("DOI", ""),
+                "arxiv_id": external_ids.get("ArXiv", ""),
+                "url": url,
+                "venue": paper_data.get("venue", "Unknown"),
+                "citation_count": paper_data.get("citationCount", 0),
+                "influential_citation_count": paper_data.get("influentialCitationCount", 0),
+                "pdf_url": pdf_url,
+                "source": "Semantic Scholar"
+            })
+
+        # Trim to max_results after filtering
+        papers = papers[:max_results]
+        logger.info(f"Found {len(papers)} papers for query: {keyword}")
+        return papers
+
+    @tenacity.retry(wait=tenacity.wait_exponential(multiplier=1, min=2, max=10), stop=tenacity.stop_after_attempt(3))
+    def search_semantic_scholar(self, query, max_results=None, days=None, require_abstract=None):
+        """
+        Search Semantic Scholar for papers matching an already-parsed query.
+
+        Args:
+            query (SearchQuery | str): Parsed query, or keywords already extracted from the command.
+            max_results (int, optional): Overrides the default when ``query`` is a string.
+            days (int, optional): Filter papers published in the last N days.
+            require_abstract (bool, optional): If True (default), only return papers with abstracts.
+
+        Returns:
+            list: List of dictionaries containing paper metadata.
+        """
+        query = SearchQuery.coerce(query, max_results=max_results, days=days, require_abstract=require_abstract)
+        try:
+            return self._fetch_semantic_scholar(query)
+        except SearchError as e:
             logger.error(f"Semantic Scholar search failed: {e}")
             st.error(f"❌ Semantic Scholar 搜尋失敗：{str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    def _fetch_arxiv_records(self, query):
+        if not (query.days and query.days > 0):
+            records = self._fetch_arxiv(query)
+        else:
+            # Same window as the Semantic Scholar leg; fetch extra to account for filtering.
+            date_filter = datetime.datetime.now() - datetime.timedelta(days=query.days)
+            kept = []
+            for record in self._fetch_arxiv(query, max_results=query.max_results * 2):
+                try:
+                    if datetime.datetime.strptime(record["published"][:10], "%Y-%m-%d") < date_filter:
+                        continue
+                except ValueError:
+                    pass  # Include if date parsing fails
+                kept.append(record)
+            records = kept[:query.max_results]
+        return [
+            {
+                "title": record["title"],
+                "abstract": record["abstract"],
+                "authors": ", ".join(record["authors"]) or "Unknown",
+                "year": record["published"][:4] or "Unknown",
+                "doi": record["doi"],
+                "arxiv_id": record["arxiv_id"],
+                "url": record["link"],
+                "venue": "arXiv",
+                "citation_count": 0,
+                "influential_citation_count": 0,
+                "pdf_url": record["pdf_url"],
+                "source": "arXiv"
+            }
+            for record in records
+        ]
+
+    def search_federated(self, query, timeout=8.0):
+        """
+        Query arXiv and Semantic Scholar concurrently and merge the results.
+
+        Each source runs on the shared thread pool; whatever has not answered within
+        ``timeout`` seconds is reported as timed out and left out, so one stalled API
+        does not hold back the other. Duplicates are merged by DOI, arXiv id or
+        normalized title, and results are ranked by reciprocal-rank fusion.
+
+        Returns:
+            tuple: (merged list of paper dicts, {source: "ok" | "timeout" | error message}).
+        """
+        query = SearchQuery.coerce(query)
+        fetchers = {"arXiv": self._fetch_arxiv_records, "Semantic Scholar": self._fetch_semantic_scholar}
+        futures = {self.executor.submit(fetch, query): source for source, fetch in fetchers.items()}
+        done, _ = wait(futures, timeout=timeout)
+        ranked_lists, status = {}, {}
+        for future, source in futures.items():
+            if future not in done:
+                status[source] = "timeout"
+                continue
+            try:
+                ranked_lists[source] = future.result()
+                status[source] = "ok"
+            except Exception as e:
+                logger.error(f"{source} search failed: {e}")
+                status[source] = str(e)
+        return merge_ranked_results(ranked_lists, query.max_results), status
+
+def merge_ranked_results(ranked_lists, limit, k=60):
+    """
+    Merge per-source ranked lists into one de-duplicated list using reciprocal-rank fusion.
+
+    Papers are the same if they share a DOI, an arXiv id (ignoring version) or a
+    normalized title. Metadata from later sources fills fields the first copy left empty.
+    """
+    merged = []
+    index = {}
+    for source, papers in ranked_lists.items():
+        for rank, paper in enumerate(papers, 1):
+            keys = [
+                ("doi", (paper.get("doi") or "").lower()),
+                ("arxiv", re.sub(r"v\d+$", "", paper.get("arxiv_id") or "")),
+                ("title", normalize_title(paper.get("title"))),
+            ]
+            keys = [key for key in keys if key[1]]
+            entry = next((index[key] for key in keys if key in index), None)
+            if entry is None:
+                entry = {"paper": dict(paper), "score": 0.0, "sources": []}
+                merged.append(entry)
+            else:
+                for field, value in paper.items():
+                    if value and entry["paper"].get(field) in (None, "", "Unknown", 0):
+                        entry["paper"][field] = value
+            entry["score"] += 1.0 / (k + rank)
+            if source not in entry["sources"]:
+                entry["sources"].append(source)
+            for key in keys:
+                index.setdefault(key, entry)
+    merged.sort(key=lambda e: e["score"], reverse=True)
+    results = []
+    for entry in merged[:limit]:
+        paper = entry["paper"]
+        paper["source"] = " + ".join(entry["sources"])
+        results.append(paper)
+    return results
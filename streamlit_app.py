@@ -1,13 +1,13 @@
 import streamlit as st
-from src.database import Database
-from src.pdf_processor import PDFProcessor
-from src.nlp import NLPProcessor
-from src.web_search import WebSearch
-from src.compare import PaperComparator
-from src.vector_store import VectorStore
-from src.memory_manager import MemoryManager
-from src.ui import render_agent_ui, render_upload_ui, render_download_ui
+from src.registry import build_default_registry
+from src.ui import render_agent_ui, render_upload_ui, render_download_ui, render_startup_report
 import os
+
+@st.cache_resource
+def get_registry():
+    """Build the component registry once per process; reruns reuse it."""
+    return build_default_registry()
+
 def main():
     try:
         if not os.getenv("OPENAI_API_KEY"):
@@ -17,18 +17,20 @@ def main():
             st.error("❌ 資料庫配置不完整，請檢查 .env 文件")
             return
         st.title("📊 論文摘要比較助手 (LLM-Powered)")
-        db = Database()
-        processor = PDFProcessor()
-        nlp = NLPProcessor()
-        web_search = WebSearch()
-        comparator = PaperComparator()
-        vector_store = VectorStore(db)  # Pass Database instance
-        memory_manager = MemoryManager(db)  # Pass Database instance
+        registry = get_registry()
+        db = registry.get("db")
+        nlp = registry.get("nlp")
+        web_search = registry.get("web_search")
+        comparator = registry.get("comparator")
+        vector_store = registry.get("vector_store")
+        ingest = registry.get("ingest")
+        memory_manager = registry.get("memory_manager", scope=st.session_state)
         render_agent_ui(db, nlp, web_search, comparator, vector_store, memory_manager)
-        render_upload_ui(db, processor, memory_manager)
+        render_upload_ui(ingest, memory_manager)
         render_download_ui(db)
+        render_startup_report(registry)
     except Exception as e:
         st.error(f"❌ 初始化失敗：{str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()